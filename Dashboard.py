@@ -1,11 +1,18 @@
 # PARA EJECUTAR : streamlit run Dashboard.py o py -m streamlit run Dashboard.py
+import time
+# Taken before the other imports so a cold start's import time counts towards the first paint.
+SCRIPT_START = time.perf_counter()
+
 import streamlit as st
 import streamlit.components.v1 as components
-import pandas as pd
-import numpy as np
-import plotly.express as px
-import plotly.graph_objects as go
+import hashlib
+import json
+import os
+import string
+import threading
 import warnings
+
+from engine.profiling import Profiler
 warnings.filterwarnings('ignore')
 
 st.set_page_config(
@@ -15,11 +22,26 @@ st.set_page_config(
     initial_sidebar_state="collapsed"
 )
 
+# ─── PROFILING ───
+# DASHBOARD_PROFILE=1 or ?profile=1 times every stage of a run and shows a waterfall under
+# the analysis section; DASHBOARD_PROFILE_LOG appends the stages to a JSON-lines file.
+PROFILE = os.environ.get('DASHBOARD_PROFILE', '0') != '0'
+profiler = Profiler(PROFILE or bool(st.query_params.get('profile')), os.environ.get('DASHBOARD_PROFILE_LOG'),
+                    origin=SCRIPT_START)
+
 FONTS_CSS = '<link rel="preconnect" href="https://fonts.googleapis.com"><link href="https://fonts.googleapis.com/css2?family=Bebas+Neue&family=DM+Sans:wght@400;500;600;700&display=swap" rel="stylesheet">'
 BASE_STYLE = '<style>*{box-sizing:border-box;margin:0;padding:0;}body{background:transparent;font-family:"DM Sans",sans-serif;color:#f0fdf4;overflow:hidden;}</style>'
 
+
+def render_html(name, html, height):
+    # components.html, recording the block's size as the bytes it ships.
+    with profiler.stage(f"html · {name}", len(html.encode('utf-8'))):
+        components.html(html, height=height)
+
+
 # ─── CUSTOM CSS ───
-st.markdown("""
+with profiler.stage('css'):
+    st.markdown("""
 <style>
     @import url('https://fonts.googleapis.com/css2?family=Bebas+Neue&family=DM+Sans:wght@400;500;600;700&display=swap');
 
@@ -127,45 +149,114 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 
-PLOTLY_LAYOUT = dict(
-    paper_bgcolor='rgba(0,0,0,0)',
-    plot_bgcolor='rgba(0,0,0,0)',
-    font=dict(family="DM Sans, sans-serif", color="#5a9070", size=11),
-    margin=dict(l=20, r=20, t=40, b=20),
-    xaxis=dict(gridcolor='rgba(30,52,38,0.6)', zerolinecolor='rgba(30,52,38,0.6)'),
-    yaxis=dict(gridcolor='rgba(30,52,38,0.6)', zerolinecolor='rgba(30,52,38,0.6)'),
-    hoverlabel=dict(bgcolor='#0a140d', bordercolor='rgba(74,222,128,0.3)', font=dict(color='#f0fdf4', family='DM Sans')),
-)
+SEPARATOR_HTML = f'{BASE_STYLE}<div style="height:1px;background:linear-gradient(to right,transparent,rgba(74,222,128,0.22),transparent);"></div>'
 
-GREEN_SEQ = ['#4ade80', '#22c55e', '#16a34a', '#15803d', '#166534', '#14532d', '#0f3d1f']
-GOLD = '#fbbf24'
-BLUE_AR = '#74acdf'
-GREEN_ACCENT = '#4ade80'
 
+# ─── FIRST PAINT ───
+# The nav, hero and club grid last built for this DASHBOARD_DATA setting are kept in
+# the Arrow cache directory (engine.storage.CACHE_DIR) and painted before pandas, the
+# engine and the table are even loaded. Once the dataset is up, they are rebuilt and
+# replaced in place if its data version differs from the cached one. The templates,
+# CSS and CLUB_COLORS live in this file, so sections cached by other code are ignored.
+STATIC_CACHE_DIR = os.environ.get('DASHBOARD_CACHE_DIR', '.cache')
+STATIC_CACHE = os.path.join(
+    STATIC_CACHE_DIR, f"static-{hashlib.sha256(os.environ.get('DASHBOARD_DATA', '').encode()).hexdigest()[:16]}.json")
+with open(__file__, 'rb') as fh:
+    APP_CODE = hashlib.sha256(fh.read()).hexdigest()[:16]
 
-@st.cache_data
-def load_data():
+
+def read_static_cache():
     try:
-        df = pd.read_excel('futbolargentino.xlsx')
-        df['Valor de mercado'] = pd.to_numeric(df['Valor de mercado'], errors='coerce')
-        df['Edad'] = pd.to_numeric(df['Edad'], errors='coerce')
-        df['Altura'] = pd.to_numeric(df['Altura'], errors='coerce')
-        df['Temporada'] = pd.to_numeric(df['Temporada'], errors='coerce')
-        df['Fichado'] = pd.to_datetime(df['Fichado'], errors='coerce')
-        df['Año Fichaje'] = df['Fichado'].dt.year
-        df['Club'] = df['Club'].astype(str)
-        df['Posicion'] = df['Posicion'].astype(str)
-        df['Pie'] = df['Pie'].astype(str)
-        df['Equipo Anterior'] = df['Equipo Anterior'].astype(str)
-        df = df.replace('nan', np.nan)
-        return df
-    except FileNotFoundError:
-        st.error("No se pudo encontrar el archivo 'futbolargentino.xlsx'")
+        with open(STATIC_CACHE, encoding='utf-8') as fh:
+            cached = json.load(fh)
+    except (OSError, ValueError):
         return None
+    return cached if cached.get('code') == APP_CODE else None
+
+
+def write_static_cache(version, static_html):
+    tmp_path = f"{STATIC_CACHE}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(STATIC_CACHE_DIR, exist_ok=True)
+        with open(tmp_path, 'w', encoding='utf-8') as fh:
+            json.dump({'version': version, 'code': APP_CODE, 'html': static_html}, fh)
+        os.replace(tmp_path, STATIC_CACHE)
+    except OSError:
+        # Read-only deploys just build the sections on every cold start.
+        pass
+
+
+def render_static(slot, static_html):
+    # Nav, hero and club grid into `slot`, replacing what it showed before.
+    with slot.container():
+        # ─── NAV BAR ───
+        render_html('nav', static_html['nav'], 68)
 
+        # ─── HERO SECTION ───
+        render_html('hero', static_html['hero'], 520)
+        render_html('separador', SEPARATOR_HTML, 4)
 
-df = load_data()
-if df is None:
+        # ─── CLUBES SECTION ───
+        render_html('clubes', static_html['clubs'], static_html['clubs_height'])
+        render_html('separador', SEPARATOR_HTML, 4)
+    profiler.mark('first_paint')
+
+
+static_slot = st.empty()
+with profiler.stage('static_cache'):
+    cached_static = read_static_cache()
+if cached_static is not None:
+    render_static(static_slot, cached_static['html'])
+
+
+# ─── DATA ───
+# Imported only now, with the cached sections already on screen.
+import pandas as pd
+import numpy as np
+
+from engine import DATA_FILE, Filters, page_rows, query, refresh_dataset
+from engine.figures import (
+    BLUE_AR, GOLD, GREEN_ACCENT, PLOTLY_LAYOUT, FigureCache, fig_altura_pos, fig_edad_altura, fig_edad_hist,
+    fig_edad_valor, fig_heatmap, fig_pie, fig_procedencia, fig_ranking, fig_top_players, fig_transfer_flow, fig_trend,
+    fig_valor_box, fig_valor_box_stats, fig_waterfall,
+)
+from engine.careers import player_timeline, transfer_flows
+
+
+# A workbook, or a Liga=/Temporada= partitioned directory written by `python -m engine.partition`.
+DATA_PATH = os.environ.get('DASHBOARD_DATA', DATA_FILE)
+
+
+@st.cache_resource
+def dataset_state():
+    # The latest Dataset, shared by every session. Seasons added with
+    # `python -m engine.ingest` are appended to it instead of reloading the history;
+    # a replaced workbook triggers a full reload.
+    return {'dataset': None, 'lock': threading.Lock()}
+
+
+def get_dataset():
+    state = dataset_state()
+    # Only the very first load makes sessions wait; while a newer dataset is being
+    # loaded and warmed, other sessions keep using the published one.
+    if not state['lock'].acquire(blocking=state['dataset'] is None):
+        return state['dataset']
+    try:
+        dataset = refresh_dataset(state['dataset'], DATA_PATH)
+        if dataset is not state['dataset']:
+            # Indexes, cube and hero totals are built in parallel and published together.
+            with profiler.stage('warm'):
+                state['dataset'] = dataset.warm()
+        return state['dataset']
+    finally:
+        state['lock'].release()
+
+
+try:
+    with profiler.stage('load'):
+        dataset = get_dataset()
+except FileNotFoundError:
+    st.error(f"No se pudo encontrar el archivo '{DATA_PATH}'")
     st.stop()
 
 CLUB_COLORS = {
@@ -200,164 +291,198 @@ CLUB_COLORS = {
 }
 
 
-# ─── NAV BAR ───
-components.html(f"""
-{FONTS_CSS}{BASE_STYLE}
-<nav style="background:rgba(6,14,10,0.94);backdrop-filter:blur(18px);border-bottom:1px solid rgba(74,222,128,0.14);padding:0 48px;display:flex;align-items:center;justify-content:space-between;height:64px;">
-    <div style="display:flex;align-items:center;gap:14px;">
-        <div style="width:38px;height:38px;background:linear-gradient(135deg,#22c55e,#15803d);border-radius:50%;display:flex;align-items:center;justify-content:center;font-size:20px;flex-shrink:0;box-shadow:0 0 18px rgba(34,197,94,0.4);">⚽</div>
-        <span style="font-family:'Bebas Neue',cursive;font-size:22px;letter-spacing:3px;color:#f0fdf4;">Fútbol Argentino</span>
-        <span style="background:rgba(74,222,128,0.1);color:#4ade80;padding:2px 12px;border-radius:100px;font-size:11px;font-weight:700;letter-spacing:1px;border:1px solid rgba(74,222,128,0.25);">2008 – 2022</span>
-    </div>
-    <div style="display:flex;gap:36px;">
-        <span style="color:#86efac;font-size:14px;font-weight:500;">Clubes</span>
-        <span style="color:#86efac;font-size:14px;font-weight:500;">Análisis</span>
-        <span style="color:#86efac;font-size:14px;font-weight:500;">Evolución</span>
-    </div>
-</nav>
-""", height=68)
-
+# ─── STATIC SECTIONS ───
+CLUB_CARD_TEMPLATE = '''
+    <div class="club-card">
+        <div style="width:64px;height:64px;border-radius:50%;background:radial-gradient(circle at 30% 30%,{bg},{ring}22);border:2.5px solid {ring};display:flex;align-items:center;justify-content:center;flex-shrink:0;box-shadow:0 0 20px {ring}33,inset 0 0 12px {ring}11;">
+            <span style="font-family:'Bebas Neue',cursive;font-size:18px;letter-spacing:1.5px;color:{ring};text-shadow:0 0 8px {ring}66;">{abbr}</span>
+        </div>
+        <div style="text-align:center;min-height:40px;display:flex;flex-direction:column;justify-content:center;">
+            <div style="font-weight:700;font-size:12px;color:#f0fdf4;line-height:1.3;margin-bottom:3px;">{Club}</div>
+            <div style="font-size:10px;color:#3d6b4a;">{players} jugadores</div>
+        </div>
+        <div style="background:rgba(251,191,36,0.08);border:1px solid rgba(251,191,36,0.18);border-radius:8px;padding:3px 10px;font-size:11px;font-weight:700;color:#fbbf24;">
+            ${avg_val_str}
+        </div>
+    </div>'''
 
-# ─── HERO SECTION ───
-total_jugadores = f"{len(df):,}"
-total_temporadas = str(df['Temporada'].nunique())
-total_clubs = str(df['Club'].nunique())
-valor_prom = df['Valor de mercado'].mean()
-valor_prom_str = f"${valor_prom/1e6:.2f}M" if valor_prom > 1e6 else f"${valor_prom:,.0f}"
-edad_prom = f"{df['Edad'].mean():.1f}"
-altura_prom = f"{df['Altura'].mean():.2f}m"
+def render_template(template, frame):
+    # Fills `template` for every row of `frame` at once by concatenating whole
+    # columns, then joins the rows into a single string.
+    html = pd.Series('', index=frame.index, dtype=object)
+    for literal, field, _, _ in string.Formatter().parse(template):
+        html = html + literal
+        if field is not None:
+            html = html + frame[field].astype(str)
+    return ''.join(html)
 
-components.html(f"""
-{FONTS_CSS}{BASE_STYLE}
-<style>
-@keyframes fadeUp {{
-  from {{ opacity: 0; transform: translateY(28px); }}
-  to {{ opacity: 1; transform: translateY(0); }}
-}}
-</style>
-<section style="position:relative;overflow:hidden;padding:70px 24px 80px;display:flex;flex-direction:column;align-items:center;text-align:center;background:#060e0a;">
-    <div style="position:absolute;inset:0;background:repeating-linear-gradient(90deg,#060e0a 0px,#060e0a 72px,#07100a 72px,#07100a 144px);pointer-events:none;"></div>
-    <div style="position:absolute;inset:0;background:radial-gradient(ellipse 65% 80% at 50% 40%,rgba(34,197,94,0.1),transparent 70%);pointer-events:none;"></div>
-    <div style="position:absolute;top:0;left:50%;transform:translateX(-50%);width:1px;height:80px;background:linear-gradient(to bottom,transparent,rgba(74,222,128,0.5));pointer-events:none;"></div>
-
-    <div style="display:flex;align-items:center;gap:14px;margin-bottom:28px;position:relative;z-index:1;animation:fadeUp 0.5s ease both;">
-        <div style="height:2px;width:40px;background:linear-gradient(to right,transparent,#74acdf);"></div>
-        <span style="font-size:12px;font-weight:700;letter-spacing:5px;color:#74acdf;text-transform:uppercase;">República Argentina</span>
-        <div style="height:2px;width:40px;background:linear-gradient(to left,transparent,#74acdf);"></div>
-    </div>
 
-    <h1 style="font-family:'Bebas Neue',cursive;font-size:clamp(60px,10vw,120px);line-height:0.88;color:#f0fdf4;margin-bottom:18px;position:relative;z-index:1;letter-spacing:3px;animation:fadeUp 0.6s 0.05s ease both;">
-        Fútbol
-        <span style="display:block;background:linear-gradient(120deg,#4ade80 0%,#22c55e 45%,#fbbf24 100%);-webkit-background-clip:text;-webkit-text-fill-color:transparent;background-clip:text;">Argentino</span>
-    </h1>
+def format_club_value(avg_val):
+    return np.where(avg_val >= 1e6, (avg_val / 1e6).map('{:.2f}M'.format), (avg_val / 1e3).map('{:.0f}K'.format))
 
-    <p style="font-size:14px;color:#86efac;letter-spacing:7px;text-transform:uppercase;font-weight:600;margin-bottom:56px;position:relative;z-index:1;animation:fadeUp 0.6s 0.1s ease both;">
-        Análisis Estadístico · 15 Temporadas
-    </p>
 
-    <div style="display:grid;grid-template-columns:repeat(6,1fr);gap:16px;width:100%;max-width:1100px;position:relative;z-index:1;animation:fadeUp 0.7s 0.2s ease both;">
-        <div style="background:rgba(10,20,13,0.88);border:1px solid rgba(74,222,128,0.2);border-radius:14px;padding:22px 14px;">
-            <div style="font-size:10px;color:#4ade80;letter-spacing:2.5px;text-transform:uppercase;font-weight:700;margin-bottom:10px;">Jugadores</div>
-            <div style="font-family:'Bebas Neue',cursive;font-size:36px;color:#f0fdf4;line-height:1;margin-bottom:5px;">{total_jugadores}</div>
-            <div style="font-size:11px;color:#3d6b4a;">Total registrados</div>
-        </div>
-        <div style="background:rgba(10,20,13,0.88);border:1px solid rgba(74,222,128,0.2);border-radius:14px;padding:22px 14px;">
-            <div style="font-size:10px;color:#4ade80;letter-spacing:2.5px;text-transform:uppercase;font-weight:700;margin-bottom:10px;">Temporadas</div>
-            <div style="font-family:'Bebas Neue',cursive;font-size:36px;color:#f0fdf4;line-height:1;margin-bottom:5px;">{total_temporadas}</div>
-            <div style="font-size:11px;color:#3d6b4a;">2008 – 2022</div>
-        </div>
-        <div style="background:rgba(10,20,13,0.88);border:1px solid rgba(74,222,128,0.2);border-radius:14px;padding:22px 14px;">
-            <div style="font-size:10px;color:#4ade80;letter-spacing:2.5px;text-transform:uppercase;font-weight:700;margin-bottom:10px;">Clubes</div>
-            <div style="font-family:'Bebas Neue',cursive;font-size:36px;color:#f0fdf4;line-height:1;margin-bottom:5px;">{total_clubs}</div>
-            <div style="font-size:11px;color:#3d6b4a;">Primera División</div>
-        </div>
-        <div style="background:rgba(10,20,13,0.88);border:1px solid rgba(251,191,36,0.22);border-radius:14px;padding:22px 14px;">
-            <div style="font-size:10px;color:#fbbf24;letter-spacing:2.5px;text-transform:uppercase;font-weight:700;margin-bottom:10px;">Valor Prom.</div>
-            <div style="font-family:'Bebas Neue',cursive;font-size:36px;color:#fbbf24;line-height:1;margin-bottom:5px;">{valor_prom_str}</div>
-            <div style="font-size:11px;color:#3d6b4a;">USD por jugador</div>
-        </div>
-        <div style="background:rgba(10,20,13,0.88);border:1px solid rgba(74,222,128,0.2);border-radius:14px;padding:22px 14px;">
-            <div style="font-size:10px;color:#4ade80;letter-spacing:2.5px;text-transform:uppercase;font-weight:700;margin-bottom:10px;">Edad Prom.</div>
-            <div style="font-family:'Bebas Neue',cursive;font-size:36px;color:#f0fdf4;line-height:1;margin-bottom:5px;">{edad_prom}</div>
-            <div style="font-size:11px;color:#3d6b4a;">años promedio</div>
+@st.cache_data
+def build_static_html(_dataset, version):
+    # Nav, hero, club grid and footer only depend on the full dataset, so they are
+    # rendered once per data version.
+    totals = _dataset.summary
+    total_jugadores = f"{totals['jugadores']:,}"
+    total_temporadas = str(totals['temporadas'])
+    total_clubs = str(totals['clubs'])
+    valor_prom = totals['valor_prom']
+    valor_prom_str = f"${valor_prom/1e6:.2f}M" if valor_prom > 1e6 else f"${valor_prom:,.0f}"
+    edad_prom = f"{totals['edad_prom']:.1f}"
+    altura_prom = f"{totals['altura_prom']:.2f}m"
+
+    palette = pd.DataFrame.from_dict(CLUB_COLORS, orient='index')
+    clubs_stats = totals['clubs_stats'].join(palette, on='Club')
+    clubs_stats['ring'] = clubs_stats['ring'].fillna('#4ade80')
+    clubs_stats['bg'] = clubs_stats['bg'].fillna('#0a140d')
+    clubs_stats['abbr'] = clubs_stats['abbr'].fillna(clubs_stats['Club'].str[:3].str.upper())
+    clubs_stats['avg_val_str'] = format_club_value(clubs_stats['avg_val'])
+    club_cards_html = render_template(CLUB_CARD_TEMPLATE, clubs_stats)
+
+    num_clubs = len(clubs_stats)
+    clubs_rows = (num_clubs + 6) // 7
+    clubs_height = 110 + clubs_rows * 210
+
+    nav_html = f"""
+    {FONTS_CSS}{BASE_STYLE}
+    <nav style="background:rgba(6,14,10,0.94);backdrop-filter:blur(18px);border-bottom:1px solid rgba(74,222,128,0.14);padding:0 48px;display:flex;align-items:center;justify-content:space-between;height:64px;">
+        <div style="display:flex;align-items:center;gap:14px;">
+            <div style="width:38px;height:38px;background:linear-gradient(135deg,#22c55e,#15803d);border-radius:50%;display:flex;align-items:center;justify-content:center;font-size:20px;flex-shrink:0;box-shadow:0 0 18px rgba(34,197,94,0.4);">⚽</div>
+            <span style="font-family:'Bebas Neue',cursive;font-size:22px;letter-spacing:3px;color:#f0fdf4;">Fútbol Argentino</span>
+            <span style="background:rgba(74,222,128,0.1);color:#4ade80;padding:2px 12px;border-radius:100px;font-size:11px;font-weight:700;letter-spacing:1px;border:1px solid rgba(74,222,128,0.25);">2008 – 2022</span>
         </div>
-        <div style="background:rgba(10,20,13,0.88);border:1px solid rgba(74,222,128,0.2);border-radius:14px;padding:22px 14px;">
-            <div style="font-size:10px;color:#4ade80;letter-spacing:2.5px;text-transform:uppercase;font-weight:700;margin-bottom:10px;">Altura Prom.</div>
-            <div style="font-family:'Bebas Neue',cursive;font-size:36px;color:#f0fdf4;line-height:1;margin-bottom:5px;">{altura_prom}</div>
-            <div style="font-size:11px;color:#3d6b4a;">talla media</div>
+        <div style="display:flex;gap:36px;">
+            <span style="color:#86efac;font-size:14px;font-weight:500;">Clubes</span>
+            <span style="color:#86efac;font-size:14px;font-weight:500;">Análisis</span>
+            <span style="color:#86efac;font-size:14px;font-weight:500;">Evolución</span>
         </div>
-    </div>
-</section>
-""", height=520)
-
-components.html(f'{BASE_STYLE}<div style="height:1px;background:linear-gradient(to right,transparent,rgba(74,222,128,0.22),transparent);"></div>', height=4)
+    </nav>
+    """
 
+    hero_html = f"""
+    {FONTS_CSS}{BASE_STYLE}
+    <style>
+    @keyframes fadeUp {{
+      from {{ opacity: 0; transform: translateY(28px); }}
+      to {{ opacity: 1; transform: translateY(0); }}
+    }}
+    </style>
+    <section style="position:relative;overflow:hidden;padding:70px 24px 80px;display:flex;flex-direction:column;align-items:center;text-align:center;background:#060e0a;">
+        <div style="position:absolute;inset:0;background:repeating-linear-gradient(90deg,#060e0a 0px,#060e0a 72px,#07100a 72px,#07100a 144px);pointer-events:none;"></div>
+        <div style="position:absolute;inset:0;background:radial-gradient(ellipse 65% 80% at 50% 40%,rgba(34,197,94,0.1),transparent 70%);pointer-events:none;"></div>
+        <div style="position:absolute;top:0;left:50%;transform:translateX(-50%);width:1px;height:80px;background:linear-gradient(to bottom,transparent,rgba(74,222,128,0.5));pointer-events:none;"></div>
+
+        <div style="display:flex;align-items:center;gap:14px;margin-bottom:28px;position:relative;z-index:1;animation:fadeUp 0.5s ease both;">
+            <div style="height:2px;width:40px;background:linear-gradient(to right,transparent,#74acdf);"></div>
+            <span style="font-size:12px;font-weight:700;letter-spacing:5px;color:#74acdf;text-transform:uppercase;">República Argentina</span>
+            <div style="height:2px;width:40px;background:linear-gradient(to left,transparent,#74acdf);"></div>
+        </div>
 
-# ─── CLUBES SECTION ───
-clubs_stats = df.groupby('Club').agg(
-    players=('Jugadores', 'count'),
-    avg_val=('Valor de mercado', 'mean')
-).reset_index().sort_values('avg_val', ascending=False)
-
-club_cards_html = ""
-for _, row in clubs_stats.iterrows():
-    club_name = row['Club']
-    players = int(row['players'])
-    avg_val = row['avg_val']
-    avg_val_str = f"{avg_val/1e6:.2f}M" if avg_val >= 1e6 else f"{avg_val/1e3:.0f}K"
-    colors = CLUB_COLORS.get(club_name, {'ring': '#4ade80', 'bg': '#0a140d', 'abbr': club_name[:3].upper()})
-    abbr = colors.get('abbr', club_name[:3].upper())
-    ring = colors['ring']
-    bg = colors['bg']
-
-    club_cards_html += f'''
-    <div class="club-card">
-        <div style="width:64px;height:64px;border-radius:50%;background:radial-gradient(circle at 30% 30%,{bg},{ring}22);border:2.5px solid {ring};display:flex;align-items:center;justify-content:center;flex-shrink:0;box-shadow:0 0 20px {ring}33,inset 0 0 12px {ring}11;">
-            <span style="font-family:\'Bebas Neue\',cursive;font-size:18px;letter-spacing:1.5px;color:{ring};text-shadow:0 0 8px {ring}66;">{abbr}</span>
+        <h1 style="font-family:'Bebas Neue',cursive;font-size:clamp(60px,10vw,120px);line-height:0.88;color:#f0fdf4;margin-bottom:18px;position:relative;z-index:1;letter-spacing:3px;animation:fadeUp 0.6s 0.05s ease both;">
+            Fútbol
+            <span style="display:block;background:linear-gradient(120deg,#4ade80 0%,#22c55e 45%,#fbbf24 100%);-webkit-background-clip:text;-webkit-text-fill-color:transparent;background-clip:text;">Argentino</span>
+        </h1>
+
+        <p style="font-size:14px;color:#86efac;letter-spacing:7px;text-transform:uppercase;font-weight:600;margin-bottom:56px;position:relative;z-index:1;animation:fadeUp 0.6s 0.1s ease both;">
+            Análisis Estadístico · 15 Temporadas
+        </p>
+
+        <div style="display:grid;grid-template-columns:repeat(6,1fr);gap:16px;width:100%;max-width:1100px;position:relative;z-index:1;animation:fadeUp 0.7s 0.2s ease both;">
+            <div style="background:rgba(10,20,13,0.88);border:1px solid rgba(74,222,128,0.2);border-radius:14px;padding:22px 14px;">
+                <div style="font-size:10px;color:#4ade80;letter-spacing:2.5px;text-transform:uppercase;font-weight:700;margin-bottom:10px;">Jugadores</div>
+                <div style="font-family:'Bebas Neue',cursive;font-size:36px;color:#f0fdf4;line-height:1;margin-bottom:5px;">{total_jugadores}</div>
+                <div style="font-size:11px;color:#3d6b4a;">Total registrados</div>
+            </div>
+            <div style="background:rgba(10,20,13,0.88);border:1px solid rgba(74,222,128,0.2);border-radius:14px;padding:22px 14px;">
+                <div style="font-size:10px;color:#4ade80;letter-spacing:2.5px;text-transform:uppercase;font-weight:700;margin-bottom:10px;">Temporadas</div>
+                <div style="font-family:'Bebas Neue',cursive;font-size:36px;color:#f0fdf4;line-height:1;margin-bottom:5px;">{total_temporadas}</div>
+                <div style="font-size:11px;color:#3d6b4a;">2008 – 2022</div>
+            </div>
+            <div style="background:rgba(10,20,13,0.88);border:1px solid rgba(74,222,128,0.2);border-radius:14px;padding:22px 14px;">
+                <div style="font-size:10px;color:#4ade80;letter-spacing:2.5px;text-transform:uppercase;font-weight:700;margin-bottom:10px;">Clubes</div>
+                <div style="font-family:'Bebas Neue',cursive;font-size:36px;color:#f0fdf4;line-height:1;margin-bottom:5px;">{total_clubs}</div>
+                <div style="font-size:11px;color:#3d6b4a;">Primera División</div>
+            </div>
+            <div style="background:rgba(10,20,13,0.88);border:1px solid rgba(251,191,36,0.22);border-radius:14px;padding:22px 14px;">
+                <div style="font-size:10px;color:#fbbf24;letter-spacing:2.5px;text-transform:uppercase;font-weight:700;margin-bottom:10px;">Valor Prom.</div>
+                <div style="font-family:'Bebas Neue',cursive;font-size:36px;color:#fbbf24;line-height:1;margin-bottom:5px;">{valor_prom_str}</div>
+                <div style="font-size:11px;color:#3d6b4a;">USD por jugador</div>
+            </div>
+            <div style="background:rgba(10,20,13,0.88);border:1px solid rgba(74,222,128,0.2);border-radius:14px;padding:22px 14px;">
+                <div style="font-size:10px;color:#4ade80;letter-spacing:2.5px;text-transform:uppercase;font-weight:700;margin-bottom:10px;">Edad Prom.</div>
+                <div style="font-family:'Bebas Neue',cursive;font-size:36px;color:#f0fdf4;line-height:1;margin-bottom:5px;">{edad_prom}</div>
+                <div style="font-size:11px;color:#3d6b4a;">años promedio</div>
+            </div>
+            <div style="background:rgba(10,20,13,0.88);border:1px solid rgba(74,222,128,0.2);border-radius:14px;padding:22px 14px;">
+                <div style="font-size:10px;color:#4ade80;letter-spacing:2.5px;text-transform:uppercase;font-weight:700;margin-bottom:10px;">Altura Prom.</div>
+                <div style="font-family:'Bebas Neue',cursive;font-size:36px;color:#f0fdf4;line-height:1;margin-bottom:5px;">{altura_prom}</div>
+                <div style="font-size:11px;color:#3d6b4a;">talla media</div>
+            </div>
         </div>
-        <div style="text-align:center;min-height:40px;display:flex;flex-direction:column;justify-content:center;">
-            <div style="font-weight:700;font-size:12px;color:#f0fdf4;line-height:1.3;margin-bottom:3px;">{club_name}</div>
-            <div style="font-size:10px;color:#3d6b4a;">{players} jugadores</div>
+    </section>
+    """
+
+    clubs_html = f"""
+    {FONTS_CSS}{BASE_STYLE}
+    <style>
+    .club-card {{
+        background:rgba(10,20,13,0.7);border:1px solid rgba(30,52,38,0.9);border-radius:16px;padding:20px 10px;
+        display:flex;flex-direction:column;align-items:center;gap:10px;cursor:pointer;
+        transition:transform 0.25s,box-shadow 0.25s,border-color 0.25s;
+    }}
+    .club-card:hover {{
+        transform:translateY(-6px);
+        box-shadow:0 16px 40px rgba(0,0,0,0.5);
+        border-color:rgba(74,222,128,0.3);
+    }}
+    </style>
+    <section style="padding:50px 24px;background:#060e0a;">
+        <div style="display:flex;align-items:baseline;gap:20px;margin-bottom:40px;">
+            <h2 style="font-family:'Bebas Neue',cursive;font-size:52px;letter-spacing:2px;color:#f0fdf4;line-height:1;">Los Clubes</h2>
+            <span style="font-size:14px;color:#3d6b4a;font-weight:500;">{num_clubs} equipos · Primera División Argentina</span>
         </div>
-        <div style="background:rgba(251,191,36,0.08);border:1px solid rgba(251,191,36,0.18);border-radius:8px;padding:3px 10px;font-size:11px;font-weight:700;color:#fbbf24;">
-            ${avg_val_str}
+        <div style="display:grid;grid-template-columns:repeat(auto-fill,minmax(155px,1fr));gap:14px;">
+            {club_cards_html}
         </div>
-    </div>'''
+    </section>
+    """
 
-num_clubs = len(clubs_stats)
-clubs_rows = (num_clubs + 6) // 7
-clubs_height = 110 + clubs_rows * 210
+    footer_html = f"""
+    {FONTS_CSS}{BASE_STYLE}
+    <footer style="border-top:1px solid rgba(30,52,38,0.8);padding:28px 24px;display:flex;align-items:center;justify-content:space-between;background:#060e0a;">
+        <div style="display:flex;align-items:center;gap:12px;">
+            <div style="width:28px;height:28px;background:linear-gradient(135deg,#22c55e,#15803d);border-radius:50%;display:flex;align-items:center;justify-content:center;font-size:15px;">⚽</div>
+            <span style="font-family:'Bebas Neue',cursive;font-size:17px;letter-spacing:2.5px;color:#3d6b4a;">Fútbol Argentino</span>
+        </div>
+        <div style="font-size:13px;color:#3d6b4a;">Fuente: Transfermarkt · {total_jugadores} jugadores · {total_clubs} clubes · {total_temporadas} temporadas</div>
+        <div style="font-size:12px;color:#2a4d33;">Dashboard estadístico · Primera División Argentina</div>
+    </footer>
+    """
+    return {
+        'nav': nav_html,
+        'hero': hero_html,
+        'clubs': clubs_html,
+        'clubs_height': clubs_height,
+        'footer': footer_html,
+    }
 
-components.html(f"""
-{FONTS_CSS}{BASE_STYLE}
-<style>
-.club-card {{
-    background:rgba(10,20,13,0.7);border:1px solid rgba(30,52,38,0.9);border-radius:16px;padding:20px 10px;
-    display:flex;flex-direction:column;align-items:center;gap:10px;cursor:pointer;
-    transition:transform 0.25s,box-shadow 0.25s,border-color 0.25s;
-}}
-.club-card:hover {{
-    transform:translateY(-6px);
-    box-shadow:0 16px 40px rgba(0,0,0,0.5);
-    border-color:rgba(74,222,128,0.3);
-}}
-</style>
-<section style="padding:50px 24px;background:#060e0a;">
-    <div style="display:flex;align-items:baseline;gap:20px;margin-bottom:40px;">
-        <h2 style="font-family:'Bebas Neue',cursive;font-size:52px;letter-spacing:2px;color:#f0fdf4;line-height:1;">Los Clubes</h2>
-        <span style="font-size:14px;color:#3d6b4a;font-weight:500;">{num_clubs} equipos · Primera División Argentina</span>
-    </div>
-    <div style="display:grid;grid-template-columns:repeat(auto-fill,minmax(155px,1fr));gap:14px;">
-        {club_cards_html}
-    </div>
-</section>
-""", height=clubs_height)
 
-components.html(f'{BASE_STYLE}<div style="height:1px;background:linear-gradient(to right,transparent,rgba(74,222,128,0.22),transparent);"></div>', height=4)
+# The cached sections when they match the loaded data; otherwise rebuilt, stored for
+# the next cold start and painted over the stale ones.
+if cached_static is not None and cached_static['version'] == dataset.version:
+    static_html = cached_static['html']
+else:
+    with profiler.stage('static_html'):
+        static_html = build_static_html(dataset, dataset.version)
+    write_static_cache(dataset.version, static_html)
+    render_static(static_slot, static_html)
 
 
 # ─── SECTION TITLE: ANÁLISIS ───
-components.html(f"""
+render_html('titulo_analisis', f"""
 {FONTS_CSS}{BASE_STYLE}
 <section style="padding:50px 24px 10px;background:#060e0a;">
     <div style="display:flex;align-items:baseline;gap:20px;margin-bottom:8px;">
@@ -365,308 +490,408 @@ components.html(f"""
         <span style="font-size:14px;color:#3d6b4a;font-weight:500;">Filtrá por equipo, jugador, temporada y posición</span>
     </div>
 </section>
-""", height=80)
-
-
-# ─── INLINE FILTERS ───
-fc1, fc2, fc3, fc4 = st.columns(4)
-
-with fc1:
-    player_search = st.text_input("Buscar Jugador", placeholder="Nombre del jugador...")
-with fc2:
-    clubs_list = sorted(df['Club'].dropna().unique().tolist())
-    selected_clubs = st.multiselect("Clubes", options=clubs_list, default=[])
-with fc3:
-    temporadas = sorted(df['Temporada'].dropna().unique())
-    selected_seasons = st.multiselect("Temporadas", options=temporadas, default=[])
-with fc4:
-    posiciones = sorted(df['Posicion'].dropna().unique().tolist())
-    selected_positions = st.multiselect("Posiciones", options=posiciones, default=[])
-
-# Apply filters
-filtered_df = df.copy()
-if player_search:
-    filtered_df = filtered_df[filtered_df['Jugadores'].str.contains(player_search, case=False, na=False)]
-if selected_clubs:
-    filtered_df = filtered_df[filtered_df['Club'].isin(selected_clubs)]
-if selected_seasons:
-    filtered_df = filtered_df[filtered_df['Temporada'].isin(selected_seasons)]
-if selected_positions:
-    filtered_df = filtered_df[filtered_df['Posicion'].isin(selected_positions)]
-
-
-# ─── FILTERED METRICS ───
-f_jugadores = f"{len(filtered_df):,}"
-f_valor = filtered_df['Valor de mercado'].mean()
-f_valor_str = f"${f_valor/1e6:.2f}M" if not pd.isna(f_valor) and f_valor >= 1e6 else (f"${f_valor:,.0f}" if not pd.isna(f_valor) else "N/A")
-f_edad = filtered_df['Edad'].mean()
-f_edad_str = f"{f_edad:.1f}" if not pd.isna(f_edad) else "N/A"
-f_clubs_count = str(filtered_df['Club'].nunique())
-active_filters = sum([bool(player_search), bool(selected_clubs), bool(selected_seasons), bool(selected_positions)])
-filter_label = f"{active_filters} filtro{'s' if active_filters != 1 else ''} activo{'s' if active_filters != 1 else ''}" if active_filters > 0 else "Sin filtros · Mostrando todos los datos"
-
-components.html(f"""
-{FONTS_CSS}{BASE_STYLE}
-<div style="display:grid;grid-template-columns:repeat(4,1fr);gap:16px;padding:16px 0;background:#060e0a;">
-    <div style="background:rgba(10,20,13,0.88);border:1px solid rgba(74,222,128,0.2);border-radius:14px;padding:18px 16px;">
-        <div style="font-size:10px;color:#4ade80;letter-spacing:2px;text-transform:uppercase;font-weight:700;margin-bottom:8px;">Jugadores</div>
-        <div style="font-family:'Bebas Neue',cursive;font-size:34px;color:#f0fdf4;line-height:1;">{f_jugadores}</div>
-        <div style="font-size:10px;color:#3d6b4a;margin-top:4px;">{filter_label}</div>
-    </div>
-    <div style="background:rgba(10,20,13,0.88);border:1px solid rgba(251,191,36,0.22);border-radius:14px;padding:18px 16px;">
-        <div style="font-size:10px;color:#fbbf24;letter-spacing:2px;text-transform:uppercase;font-weight:700;margin-bottom:8px;">Valor Promedio</div>
-        <div style="font-family:'Bebas Neue',cursive;font-size:34px;color:#fbbf24;line-height:1;">{f_valor_str}</div>
-        <div style="font-size:10px;color:#3d6b4a;margin-top:4px;">USD por jugador</div>
-    </div>
-    <div style="background:rgba(10,20,13,0.88);border:1px solid rgba(74,222,128,0.2);border-radius:14px;padding:18px 16px;">
-        <div style="font-size:10px;color:#4ade80;letter-spacing:2px;text-transform:uppercase;font-weight:700;margin-bottom:8px;">Edad Promedio</div>
-        <div style="font-family:'Bebas Neue',cursive;font-size:34px;color:#f0fdf4;line-height:1;">{f_edad_str} <span style="font-size:14px;color:#3d6b4a;font-family:'DM Sans';">años</span></div>
-    </div>
-    <div style="background:rgba(10,20,13,0.88);border:1px solid rgba(74,222,128,0.2);border-radius:14px;padding:18px 16px;">
-        <div style="font-size:10px;color:#4ade80;letter-spacing:2px;text-transform:uppercase;font-weight:700;margin-bottom:8px;">Clubes</div>
-        <div style="font-family:'Bebas Neue',cursive;font-size:34px;color:#f0fdf4;line-height:1;">{f_clubs_count}</div>
-        <div style="font-size:10px;color:#3d6b4a;margin-top:4px;">equipos incluidos</div>
-    </div>
-</div>
-""", height=130)
+""", 80)
 
 
 def render_chart_card(label, title, label_color="#4ade80"):
-    components.html(f"""
+    render_html(f"tarjeta · {title}", f"""
     {FONTS_CSS}{BASE_STYLE}
     <div style="background:rgba(10,20,13,0.7);border:1px solid rgba(30,52,38,0.9);border-radius:16px 16px 0 0;padding:18px 24px 10px;">
         <div style="font-size:10px;color:{label_color};letter-spacing:2.5px;text-transform:uppercase;font-weight:700;margin-bottom:3px;">{label}</div>
         <div style="font-weight:700;font-size:14px;color:#f0fdf4;">{title}</div>
     </div>
-    """, height=65)
+    """, 65)
+
+
+# ─── FIGURE CACHE ───
+FIGURE_CACHE_MB = float(os.environ.get('DASHBOARD_FIGURE_CACHE_MB', '64'))
+LAZY_TABS = os.environ.get('DASHBOARD_LAZY_TABS', '1') != '0'
+
+@st.cache_resource
+def get_figure_cache():
+    return FigureCache(int(FIGURE_CACHE_MB * 1024 * 1024))
+
+
+NO_FIGURE = ''
+
+
+def show_figure(result, chart_id, builder, data, *options):
+    # `data` is a zero-argument callable so the chart's series or rows are only
+    # materialized on a cache miss. Builders return None when there is nothing
+    # to plot; that is cached too.
+    figure_cache = get_figure_cache()
+    key = (chart_id, result.filters.key(), dataset.version)
+    with profiler.stage(f"chart · {chart_id}"):
+        payload = figure_cache.get(key)
+        if payload is None:
+            with profiler.stage('series'):
+                chart_data = data()
+            with profiler.stage('build'):
+                fig = builder(chart_data, *options)
+            with profiler.stage('serialize'):
+                payload = NO_FIGURE if fig is None else fig.to_json()
+            figure_cache.put(key, payload)
+        else:
+            with profiler.stage('cache_hit'):
+                import plotly.io as pio
+                fig = None if payload == NO_FIGURE else pio.from_json(payload)
+        if fig is not None:
+            with profiler.stage('send'):
+                st.plotly_chart(fig, use_container_width=True)
+            profiler.count_bytes(len(payload))
 
 
 # ─── TABS ───
-tab1, tab2, tab3, tab4 = st.tabs([
-    "PERFIL DE JUGADORES",
-    "VALOR DE MERCADO",
-    "EQUIPOS Y FICHAJES",
-    "EVOLUCIÓN TEMPORAL"
-])
-
-with tab1:
+def render_perfil(result):
+    series = result.series
     col1, col2, col3 = st.columns(3)
 
     with col1:
         render_chart_card("Distribución", "Edad de Jugadores")
-        fig = px.histogram(filtered_df, x='Edad', nbins=20, color_discrete_sequence=[GREEN_ACCENT])
-        fig.update_traces(marker_line_color='rgba(74,222,128,0.3)', marker_line_width=1)
-        fig.update_layout(**PLOTLY_LAYOUT, showlegend=False, height=250)
-        st.plotly_chart(fig, use_container_width=True)
+        show_figure(result, 'edad_hist', fig_edad_hist, lambda: series['edad_hist'])
 
     with col2:
         render_chart_card("Breakdown", "Pie Dominante")
-        pie_data = filtered_df['Pie'].value_counts()
-        if len(pie_data) > 0:
-            fig = px.pie(values=pie_data.values, names=pie_data.index, color_discrete_sequence=GREEN_SEQ, hole=0.65)
-            fig.update_traces(textfont=dict(color='#f0fdf4', size=11), marker=dict(line=dict(color='#0a140d', width=2)))
-            fig.update_layout(**PLOTLY_LAYOUT, showlegend=True, height=250, legend=dict(font=dict(color='#5a9070', size=10)))
-            st.plotly_chart(fig, use_container_width=True)
+        show_figure(result, 'pie', fig_pie, lambda: series['pie'])
 
     with col3:
         render_chart_card("Comparativa", "Altura por Posición", GOLD)
-        altura_pos = filtered_df.groupby('Posicion')['Altura'].mean().dropna().sort_values(ascending=True)
-        if len(altura_pos) > 0:
-            fig = px.bar(x=altura_pos.values, y=altura_pos.index, orientation='h', color_discrete_sequence=[GOLD])
-            fig.update_traces(marker_line_color='rgba(251,191,36,0.3)', marker_line_width=1)
-            fig.update_layout(**PLOTLY_LAYOUT, showlegend=False, height=250)
-            st.plotly_chart(fig, use_container_width=True)
+        show_figure(result, 'altura_pos', fig_altura_pos, lambda: series['altura_pos'])
 
     render_chart_card("Scatter", "Relación Edad vs Altura por Posición")
-    scatter_data = filtered_df.dropna(subset=['Edad', 'Altura'])
-    if len(scatter_data) > 0:
-        fig = px.scatter(scatter_data, x='Edad', y='Altura', color='Posicion', opacity=0.6,
-                         color_discrete_sequence=GREEN_SEQ + [GOLD, BLUE_AR, '#e3001b', '#f5c400'])
-        fig.update_layout(**PLOTLY_LAYOUT, showlegend=True, height=320, legend=dict(font=dict(color='#5a9070', size=10)))
-        st.plotly_chart(fig, use_container_width=True)
+    show_figure(result, 'edad_altura', fig_edad_altura, lambda: result.rows)
 
 
-with tab2:
+def render_valor(result):
+    series = result.series
     col1, col2 = st.columns(2)
 
     with col1:
         render_chart_card("Ranking", "Top 10 Jugadores Más Valiosos", GOLD)
-        top_players = filtered_df.dropna(subset=['Valor de mercado']).nlargest(10, 'Valor de mercado')
-        if len(top_players) > 0:
-            fig = px.bar(top_players, x='Valor de mercado', y='Jugadores', orientation='h',
-                         color='Valor de mercado',
-                         color_continuous_scale=[[0, '#15803d'], [0.5, '#22c55e'], [1, '#4ade80']],
-                         hover_data=['Posicion', 'Club'])
-            fig.update_layout(**PLOTLY_LAYOUT, showlegend=False, height=340, coloraxis_showscale=False)
-            st.plotly_chart(fig, use_container_width=True)
+        show_figure(result, 'top_players', fig_top_players, lambda: result.rows)
 
         render_chart_card("Distribución", "Valor por Posición (Box)", GOLD)
-        boxplot_data = filtered_df.dropna(subset=['Valor de mercado', 'Posicion'])
-        if len(boxplot_data) > 0:
-            fig = px.box(boxplot_data, x='Posicion', y='Valor de mercado', color_discrete_sequence=[GREEN_ACCENT])
-            fig.update_traces(marker_color=GREEN_ACCENT, line_color=GREEN_ACCENT)
-            fig.update_layout(**PLOTLY_LAYOUT, showlegend=False, height=340, xaxis_tickangle=-45)
-            st.plotly_chart(fig, use_container_width=True)
+        if 'valor_box' in series.builders:
+            # Sketch mode: quartiles merged from the cube instead of sorting the rows.
+            show_figure(result, 'valor_box', fig_valor_box_stats, lambda: series['valor_box'])
+        else:
+            show_figure(result, 'valor_box', fig_valor_box, lambda: result.rows)
 
     with col2:
         render_chart_card("Comparativa", "Valor Total por Club")
-        valor_club = filtered_df.groupby('Club')['Valor de mercado'].sum().dropna().sort_values(ascending=True)
-        if len(valor_club) > 0:
-            fig = px.bar(x=valor_club.values, y=valor_club.index, orientation='h', color_discrete_sequence=[GREEN_ACCENT])
-            fig.update_traces(marker_line_color='rgba(74,222,128,0.25)', marker_line_width=1)
-            fig.update_layout(**PLOTLY_LAYOUT, showlegend=False, height=340)
-            st.plotly_chart(fig, use_container_width=True)
+        show_figure(result, 'valor_club', fig_ranking, lambda: series['valor_club'], GREEN_ACCENT, 'rgba(74,222,128,0.25)', 340)
 
         render_chart_card("Scatter", "Edad vs Valor de Mercado", GOLD)
-        scatter_val = filtered_df.dropna(subset=['Edad', 'Valor de mercado', 'Altura'])
-        if len(scatter_val) > 0:
-            fig = px.scatter(scatter_val, x='Edad', y='Valor de mercado', color='Posicion', size='Altura',
-                             opacity=0.6, hover_data=['Jugadores', 'Club'],
-                             color_discrete_sequence=GREEN_SEQ + [GOLD, BLUE_AR])
-            fig.update_layout(**PLOTLY_LAYOUT, showlegend=True, height=340, legend=dict(font=dict(color='#5a9070', size=10)))
-            st.plotly_chart(fig, use_container_width=True)
+        show_figure(result, 'edad_valor', fig_edad_valor, lambda: result.rows)
 
 
-with tab3:
+def render_equipos(result):
+    series = result.series
     col1, col2 = st.columns(2)
 
     with col1:
         render_chart_card("Heatmap", "Posiciones por Club")
-        pos_club_data = filtered_df.dropna(subset=['Club', 'Posicion'])
-        if len(pos_club_data) > 0:
-            pos_club = pd.crosstab(pos_club_data['Club'], pos_club_data['Posicion'])
-            fig = px.imshow(pos_club, aspect='auto',
-                            color_continuous_scale=[[0, '#060e0a'], [0.3, '#14532d'], [0.6, '#22c55e'], [1, '#4ade80']])
-            fig.update_layout(**PLOTLY_LAYOUT, showlegend=False, height=380)
-            st.plotly_chart(fig, use_container_width=True)
+        show_figure(result, 'pos_club', fig_heatmap, lambda: series['pos_club'],
+                    [[0, '#060e0a'], [0.3, '#14532d'], [0.6, '#22c55e'], [1, '#4ade80']], 380)
 
         render_chart_card("Ranking", "Jugadores por Club")
-        jug_club = filtered_df['Club'].value_counts()
-        if len(jug_club) > 0:
-            fig = px.bar(x=jug_club.values, y=jug_club.index, orientation='h', color_discrete_sequence=[GREEN_ACCENT])
-            fig.update_traces(marker_line_color='rgba(74,222,128,0.25)', marker_line_width=1)
-            fig.update_layout(**PLOTLY_LAYOUT, showlegend=False, height=340)
-            st.plotly_chart(fig, use_container_width=True)
+        show_figure(result, 'jug_club', fig_ranking, lambda: series['jug_club'], GREEN_ACCENT, 'rgba(74,222,128,0.25)', 340)
 
     with col2:
         render_chart_card("Ranking", "Top 15 Equipos Anteriores", "#a78bfa")
-        eq_ant = filtered_df['Equipo Anterior'].dropna().value_counts().head(15)
-        if len(eq_ant) > 0:
-            fig = px.bar(x=eq_ant.values, y=eq_ant.index, orientation='h', color_discrete_sequence=['#a78bfa'])
-            fig.update_traces(marker_line_color='rgba(167,139,250,0.3)', marker_line_width=1)
-            fig.update_layout(**PLOTLY_LAYOUT, showlegend=False, height=380)
-            st.plotly_chart(fig, use_container_width=True)
+        show_figure(result, 'eq_ant', fig_ranking, lambda: series['eq_ant'], '#a78bfa', 'rgba(167,139,250,0.3)', 380)
 
         render_chart_card("Breakdown", "Procedencia de Jugadores")
-        filtered_df_temp = filtered_df.copy()
-        filtered_df_temp['EsInferiores'] = filtered_df_temp['Equipo Anterior'].str.contains('Inferiores', na=False)
-        inf_count = filtered_df_temp['EsInferiores'].value_counts()
-        if len(inf_count) > 0:
-            labels = ['Externos' if not k else 'Inferiores' for k in inf_count.index]
-            fig = px.pie(values=inf_count.values, names=labels, color_discrete_sequence=[GREEN_ACCENT, GOLD], hole=0.65)
-            fig.update_traces(textfont=dict(color='#f0fdf4', size=11), marker=dict(line=dict(color='#0a140d', width=2)))
-            fig.update_layout(**PLOTLY_LAYOUT, showlegend=True, height=340, legend=dict(font=dict(color='#5a9070', size=10)))
-            st.plotly_chart(fig, use_container_width=True)
-
-
-with tab4:
-    components.html(f"""
+        show_figure(result, 'procedencia', fig_procedencia, lambda: series['procedencia'])
+
+    # Transfers and careers are lookups in the dataset's career index, built once per
+    # data version; the flow only follows the club filter, over every season. A
+    # partitioned dataset only has the selected seasons' partitions loaded.
+    careers = result.dataset.careers
+    seasons = sorted(result.filters.seasons) if dataset.partitioned else []
+    if not seasons:
+        scope = "todas las temporadas"
+    elif len(seasons) == 1:
+        scope = f"temporada {seasons[0]}"
+    else:
+        scope = f"{len(seasons)} temporadas seleccionadas"
+    render_chart_card("Red de Fichajes", f"Flujo Equipo Anterior → Club ({scope})", GOLD)
+    show_figure(result, 'flujo', fig_transfer_flow, lambda: transfer_flows(careers, result.filters.clubs))
+
+    if result.filters.search:
+        names = result.rows['Jugadores'].dropna().unique().tolist()[:50]
+        if names:
+            player = st.selectbox("Trayectoria del jugador", options=names, key='trayectoria')
+            timeline = player_timeline(careers, result.dataset.df, player)
+            render_chart_card("Trayectoria", f"{player} ({scope})" if seasons else player, BLUE_AR)
+            show_figure(result, f'carrera · {player}', fig_trend,
+                        lambda: timeline.groupby('Temporada', observed=True)['Valor de mercado'].mean().dropna(),
+                        BLUE_AR, 'rgba(116,172,223,0.08)', 7, 'Temporada: %{x}<br>Valor: $%{y:,.0f}<extra></extra>', 260)
+            st.dataframe(timeline[['Temporada', 'Club', 'Posicion', 'Edad', 'Equipo Anterior', 'Fichado',
+                                   'Valor de mercado']],
+                         use_container_width=True, hide_index=True)
+
+
+def render_evolucion(result):
+    series = result.series
+    render_html('titulo_evolucion', f"""
     {FONTS_CSS}{BASE_STYLE}
     <div style="display:flex;align-items:baseline;gap:20px;padding:8px 0;">
         <h2 style="font-family:'Bebas Neue',cursive;font-size:42px;letter-spacing:2px;color:#f0fdf4;line-height:1;">Evolución</h2>
         <span style="font-size:14px;color:#3d6b4a;font-weight:500;">Tendencias a lo largo del tiempo</span>
     </div>
-    """, height=55)
+    """, 55)
 
     col1, col2 = st.columns([2, 1])
 
     with col1:
         render_chart_card("Tendencia", "Valor Promedio de Mercado")
-        valor_temp = filtered_df.groupby('Temporada')['Valor de mercado'].mean().dropna()
-        if len(valor_temp) > 0:
-            fig = go.Figure()
-            fig.add_trace(go.Scatter(
-                x=valor_temp.index, y=valor_temp.values, mode='lines+markers',
-                line=dict(color=GREEN_ACCENT, width=2.5, shape='spline'),
-                marker=dict(color=GREEN_ACCENT, size=8, line=dict(color='#060e0a', width=2)),
-                fill='tozeroy', fillcolor='rgba(74,222,128,0.08)',
-                hovertemplate='Temporada: %{x}<br>Valor: $%{y:,.0f}<extra></extra>'))
-            fig.update_layout(**PLOTLY_LAYOUT, showlegend=False, height=320)
-            st.plotly_chart(fig, use_container_width=True)
+        show_figure(result, 'valor_temp', fig_trend, lambda: series['valor_temp'], GREEN_ACCENT, 'rgba(74,222,128,0.08)', 8,
+                    'Temporada: %{x}<br>Valor: $%{y:,.0f}<extra></extra>', 320)
 
     with col2:
         render_chart_card("Evolución", "Edad Promedio por Temporada", BLUE_AR)
-        edad_temp = filtered_df.groupby('Temporada')['Edad'].mean().dropna()
-        if len(edad_temp) > 0:
-            fig = go.Figure()
-            fig.add_trace(go.Scatter(
-                x=edad_temp.index, y=edad_temp.values, mode='lines+markers',
-                line=dict(color=BLUE_AR, width=2.5, shape='spline'),
-                marker=dict(color=BLUE_AR, size=7, line=dict(color='#060e0a', width=2)),
-                fill='tozeroy', fillcolor='rgba(116,172,223,0.08)',
-                hovertemplate='Temporada: %{x}<br>Edad: %{y:.1f} años<extra></extra>'))
-            fig.update_layout(**PLOTLY_LAYOUT, showlegend=False, height=320)
-            st.plotly_chart(fig, use_container_width=True)
+        show_figure(result, 'edad_temp', fig_trend, lambda: series['edad_temp'], BLUE_AR, 'rgba(116,172,223,0.08)', 7,
+                    'Temporada: %{x}<br>Edad: %{y:.1f} años<extra></extra>', 320)
 
     col1, col2 = st.columns(2)
 
     with col1:
         render_chart_card("Tendencia", "Fichajes por Año", GOLD)
-        if 'Año Fichaje' in filtered_df.columns:
-            fichajes = filtered_df['Año Fichaje'].dropna().value_counts().sort_index()
-            if len(fichajes) > 0:
-                fig = go.Figure()
-                fig.add_trace(go.Scatter(
-                    x=fichajes.index, y=fichajes.values, mode='lines+markers',
-                    line=dict(color=GOLD, width=2.5, shape='spline'),
-                    marker=dict(color=GOLD, size=7, line=dict(color='#060e0a', width=2)),
-                    fill='tozeroy', fillcolor='rgba(251,191,36,0.08)',
-                    hovertemplate='Año: %{x}<br>Fichajes: %{y}<extra></extra>'))
-                fig.update_layout(**PLOTLY_LAYOUT, showlegend=False, height=280)
-                st.plotly_chart(fig, use_container_width=True)
+        show_figure(result, 'fichajes', fig_trend, lambda: series['fichajes'], GOLD, 'rgba(251,191,36,0.08)', 7,
+                    'Año: %{x}<br>Fichajes: %{y}<extra></extra>', 280)
 
     with col2:
         render_chart_card("Heatmap", "Fichajes por Temporada y Club")
-        hm_data = filtered_df.dropna(subset=['Temporada', 'Club'])
-        if len(hm_data) > 0:
-            fichajes_hm = pd.crosstab(hm_data['Temporada'], hm_data['Club'])
-            if len(fichajes_hm) > 0:
-                fig = px.imshow(fichajes_hm, aspect='auto',
-                                color_continuous_scale=[[0, '#060e0a'], [0.3, '#7f1d1d'], [0.6, '#dc2626'], [1, '#fbbf24']])
-                fig.update_layout(**PLOTLY_LAYOUT, showlegend=False, height=280)
-                st.plotly_chart(fig, use_container_width=True)
+        show_figure(result, 'temp_club', fig_heatmap, lambda: series['temp_club'],
+                    [[0, '#060e0a'], [0.3, '#7f1d1d'], [0.6, '#dc2626'], [1, '#fbbf24']], 280)
 
 
-# ─── RAW DATA SECTION ───
-components.html(f'{BASE_STYLE}<div style="height:1px;background:linear-gradient(to right,transparent,rgba(74,222,128,0.22),transparent);margin:20px 0;"></div>', height=6)
+SECTIONS = {
+    "PERFIL DE JUGADORES": render_perfil,
+    "VALOR DE MERCADO": render_valor,
+    "EQUIPOS Y FICHAJES": render_equipos,
+    "EVOLUCIÓN TEMPORAL": render_evolucion,
+}
 
-components.html(f"""
-{FONTS_CSS}{BASE_STYLE}
-<div style="display:flex;align-items:baseline;gap:16px;padding:8px 0;">
-    <div style="font-size:10px;color:#4ade80;letter-spacing:2.5px;text-transform:uppercase;font-weight:700;">Datos</div>
-    <div style="font-weight:700;font-size:16px;color:#f0fdf4;">Datos Filtrados</div>
-    <span style="margin-left:auto;font-size:12px;color:#3d6b4a;">Usá los filtros de arriba para refinar</span>
-</div>
-""", height=42)
-
-with st.expander("Ver datos completos filtrados"):
-    st.dataframe(filtered_df, use_container_width=True)
-    csv = filtered_df.to_csv(index=False)
+def render_data_table(result):
+    # Only the visible page is sent to the browser; sorting runs on the server over
+    # the whole match set.
+    df = result.dataset.df
+    total = len(df) if result.row_ids is None else len(result.row_ids)
+    dc1, dc2, dc3, dc4 = st.columns([3, 2, 2, 2])
+    with dc1:
+        sort_by = st.selectbox("Ordenar por", options=[None] + list(df.columns), key='datos_orden',
+                               format_func=lambda col: 'Sin ordenar' if col is None else col)
+    with dc2:
+        descending = st.toggle("Descendente", key='datos_desc', disabled=sort_by is None)
+    with dc3:
+        page_size = st.selectbox("Filas por página", options=[25, 50, 100, 250], index=1, key='datos_filas')
+    pages = max(1, -(-total // page_size))
+    with dc4:
+        # No key: a new page count (other filters, page size) starts again at page 1.
+        page = st.number_input("Página", min_value=1, max_value=pages, value=1, step=1)
+
+    page_df = page_rows(result, sort_by, not descending, page - 1, page_size)
+    st.dataframe(page_df, use_container_width=True)
+    first = (page - 1) * page_size
+    st.caption(f"Filas {first + 1:,}–{first + len(page_df):,} de {total:,}" if total else "Sin filas para los filtros actuales")
+
+
+def render_export(result):
+    # The file is only written when the button is clicked, in chunks and off the
+    # script thread; `df` and `row_ids` pin this rerun's result for the deferred call.
+    from engine.export import EXPORT_FORMATS, export_rows
+    export_format = st.radio("Formato", options=list(EXPORT_FORMATS), horizontal=True,
+                             format_func=lambda fmt: EXPORT_FORMATS[fmt].label)
+    export = EXPORT_FORMATS[export_format]
+    df, row_ids = result.dataset.df, result.row_ids
     st.download_button(
-        label="Descargar datos filtrados como CSV",
-        data=csv, file_name="futbol_argentino_filtrado.csv", mime="text/csv"
+        label=f"Descargar datos filtrados como {export.label}",
+        data=lambda: export_rows(df, export_format, row_ids),
+        file_name=f"futbol_argentino_filtrado.{export.extension}", mime=export.mime, on_click='ignore'
     )
 
 
-# ─── FOOTER ───
-components.html(f"""
-{FONTS_CSS}{BASE_STYLE}
-<footer style="border-top:1px solid rgba(30,52,38,0.8);padding:28px 24px;display:flex;align-items:center;justify-content:space-between;background:#060e0a;">
-    <div style="display:flex;align-items:center;gap:12px;">
-        <div style="width:28px;height:28px;background:linear-gradient(135deg,#22c55e,#15803d);border-radius:50%;display:flex;align-items:center;justify-content:center;font-size:15px;">⚽</div>
-        <span style="font-family:'Bebas Neue',cursive;font-size:17px;letter-spacing:2.5px;color:#3d6b4a;">Fútbol Argentino</span>
+def render_profile():
+    # Waterfall of the stages timed so far in this run, plus the raw records.
+    shipped = sum(record['bytes'] or 0 for record in profiler.records)
+    label = 'Fragmento' if profiler.kind == 'fragment' else 'Página completa'
+    if 'first_paint' in profiler.marks:
+        label += f" · primer pintado {profiler.marks['first_paint']:.0f} ms"
+    with st.expander(f"Perfil de ejecución · {label} · {profiler.elapsed_ms():.0f} ms · {shipped / 1024:,.0f} KB enviados"):
+        fig = fig_waterfall(profiler.records)
+        if fig is not None:
+            st.plotly_chart(fig, use_container_width=True)
+        st.dataframe(pd.DataFrame(profiler.records), use_container_width=True, hide_index=True)
+
+
+# ─── BROWSER CROSS-FILTERING ───
+# The cube goes to the browser once per data version as a compact binary payload, and
+# the club, season and position chips, KPI cards and aggregate charts are filtered
+# there without rerunning anything. A name search and the raw rows still use the server.
+CLIENT_FILTERS = os.environ.get('DASHBOARD_CLIENT_FILTERS', '0') != '0'
+crossfilter = components.declare_component(
+    'crossfilter', path=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'components', 'crossfilter'))
+
+
+@st.cache_data(max_entries=2)
+def crossfilter_payload(_dataset, version):
+    from engine.crossfilter import cube_payload
+    return cube_payload(_dataset.cube)
+
+
+def render_crossfilter():
+    # The component's value is the selection last sent with "Ver filas con estos
+    # filtros"; it only sets the filters of the raw rows below.
+    from plotly.offline import get_plotlyjs_version
+    options = dataset.filter_options
+    default = {'Club': [], 'Temporada': options['Temporada'][-1:] if dataset.partitioned else [], 'Posicion': []}
+    with profiler.stage('crossfilter'):
+        payload = crossfilter_payload(dataset, dataset.version)
+        profiler.count_bytes(len(payload))
+        selections = crossfilter(
+            payload=payload, version=str(dataset.version), layout=PLOTLY_LAYOUT,
+            plotly_src=f"https://cdn.plot.ly/plotly-{get_plotlyjs_version()}.min.js",
+            selections=st.session_state.get('crossfilter') or default, key='crossfilter', default=default,
+        )
+    filters = Filters('', tuple(selections['Club']), tuple(selections['Temporada']), tuple(selections['Posicion']))
+    with profiler.stage('query'):
+        return query(dataset, filters)
+
+
+def render_server_charts(result, filters, player_search):
+    series = result.series
+
+    if result.fuzzy:
+        st.caption(f"Sin coincidencias exactas para \"{player_search}\" · mostrando jugadores con nombres similares")
+
+    # ─── FILTERED METRICS ───
+    with profiler.stage('kpis'):
+        f_jugadores = f"{series['jugadores']:,}"
+        f_valor = series['valor_prom']
+        f_edad = series['edad_prom']
+        f_clubs_count = str(series['clubs'])
+        f_distintos = series['jugadores_distintos'] if 'jugadores_distintos' in series.builders else None
+    f_valor_str = f"${f_valor/1e6:.2f}M" if not pd.isna(f_valor) and f_valor >= 1e6 else (f"${f_valor:,.0f}" if not pd.isna(f_valor) else "N/A")
+    f_edad_str = f"{f_edad:.1f}" if not pd.isna(f_edad) else "N/A"
+    active_filters = filters.active
+    filter_label = f"{active_filters} filtro{'s' if active_filters != 1 else ''} activo{'s' if active_filters != 1 else ''}" if active_filters > 0 else "Sin filtros · Mostrando todos los datos"
+    if f_distintos is not None:
+        filter_label = f"≈{f_distintos:,} distintos · {filter_label}"
+
+    render_html('metricas', f"""
+    {FONTS_CSS}{BASE_STYLE}
+    <div style="display:grid;grid-template-columns:repeat(4,1fr);gap:16px;padding:16px 0;background:#060e0a;">
+        <div style="background:rgba(10,20,13,0.88);border:1px solid rgba(74,222,128,0.2);border-radius:14px;padding:18px 16px;">
+            <div style="font-size:10px;color:#4ade80;letter-spacing:2px;text-transform:uppercase;font-weight:700;margin-bottom:8px;">Jugadores</div>
+            <div style="font-family:'Bebas Neue',cursive;font-size:34px;color:#f0fdf4;line-height:1;">{f_jugadores}</div>
+            <div style="font-size:10px;color:#3d6b4a;margin-top:4px;">{filter_label}</div>
+        </div>
+        <div style="background:rgba(10,20,13,0.88);border:1px solid rgba(251,191,36,0.22);border-radius:14px;padding:18px 16px;">
+            <div style="font-size:10px;color:#fbbf24;letter-spacing:2px;text-transform:uppercase;font-weight:700;margin-bottom:8px;">Valor Promedio</div>
+            <div style="font-family:'Bebas Neue',cursive;font-size:34px;color:#fbbf24;line-height:1;">{f_valor_str}</div>
+            <div style="font-size:10px;color:#3d6b4a;margin-top:4px;">USD por jugador</div>
+        </div>
+        <div style="background:rgba(10,20,13,0.88);border:1px solid rgba(74,222,128,0.2);border-radius:14px;padding:18px 16px;">
+            <div style="font-size:10px;color:#4ade80;letter-spacing:2px;text-transform:uppercase;font-weight:700;margin-bottom:8px;">Edad Promedio</div>
+            <div style="font-family:'Bebas Neue',cursive;font-size:34px;color:#f0fdf4;line-height:1;">{f_edad_str} <span style="font-size:14px;color:#3d6b4a;font-family:'DM Sans';">años</span></div>
+        </div>
+        <div style="background:rgba(10,20,13,0.88);border:1px solid rgba(74,222,128,0.2);border-radius:14px;padding:18px 16px;">
+            <div style="font-size:10px;color:#4ade80;letter-spacing:2px;text-transform:uppercase;font-weight:700;margin-bottom:8px;">Clubes</div>
+            <div style="font-family:'Bebas Neue',cursive;font-size:34px;color:#f0fdf4;line-height:1;">{f_clubs_count}</div>
+            <div style="font-size:10px;color:#3d6b4a;margin-top:4px;">equipos incluidos</div>
+        </div>
+    </div>
+    """, 130)
+
+    # In lazy mode Streamlit tracks the selected tab and reruns on change, so only the
+    # open section computes its series and ships its figures.
+    tabs = st.tabs(list(SECTIONS), key='seccion', on_change='rerun' if LAZY_TABS else 'ignore')
+    for tab, (section, render_section) in zip(tabs, SECTIONS.items()):
+        if tab.open is False:
+            continue
+        with tab, profiler.stage(f"tab · {section}"):
+            render_section(result)
+
+
+# ─── ANÁLISIS (FRAGMENT) ───
+# Filter and tab interactions only rerun this fragment; the static sections above
+# and the footer below are not touched again until a full rerun.
+@st.fragment
+def render_analysis():
+    if profiler.finished:
+        # A fragment-only rerun: profile it as a run of its own.
+        profiler.start('fragment')
+
+    # ─── INLINE FILTERS ───
+    client_side = st.toggle("Filtrado en el navegador", value=CLIENT_FILTERS, key='filtrado_navegador',
+                            help="Filtra los indicadores y gráficos agregados sin volver al servidor")
+    fc1, fc2, fc3, fc4 = st.columns(4)
+    options = dataset.filter_options
+
+    with fc1:
+        player_search = st.text_input("Buscar Jugador", placeholder="Nombre del jugador...")
+    if client_side and not player_search:
+        # Scatters, top players and the value box plot need the rows; they stay in the
+        # server view, which a name search also switches back to.
+        with fc2:
+            st.caption("Escribí un nombre para buscar jugadores en el servidor")
+        result = render_crossfilter()
+    else:
+        with fc2:
+            selected_clubs = st.multiselect("Clubes", options=options['Club'], default=[])
+        with fc3:
+            # A partitioned dataset opens on its latest season so the first view only reads that partition.
+            selected_seasons = st.multiselect("Temporadas", options=options['Temporada'],
+                                              default=options['Temporada'][-1:] if dataset.partitioned else [])
+        with fc4:
+            selected_positions = st.multiselect("Posiciones", options=options['Posicion'], default=[])
+
+        filters = Filters(player_search, tuple(selected_clubs), tuple(selected_seasons), tuple(selected_positions))
+        with profiler.stage('query'):
+            # Narrowing the previous filters (one more character, one club fewer) only
+            # re-checks the previous result's rows.
+            result = query(dataset, filters, previous=st.session_state.get('last_query'))
+        # Only the filters, row ids and search cube: the rows and the Dataset stay with this run.
+        st.session_state['last_query'] = result.state()
+        render_server_charts(result, filters, player_search)
+
+    # ─── RAW DATA SECTION ───
+    render_html('separador', f'{BASE_STYLE}<div style="height:1px;background:linear-gradient(to right,transparent,rgba(74,222,128,0.22),transparent);margin:20px 0;"></div>', 6)
+
+    render_html('titulo_datos', f"""
+    {FONTS_CSS}{BASE_STYLE}
+    <div style="display:flex;align-items:baseline;gap:16px;padding:8px 0;">
+        <div style="font-size:10px;color:#4ade80;letter-spacing:2.5px;text-transform:uppercase;font-weight:700;">Datos</div>
+        <div style="font-weight:700;font-size:16px;color:#f0fdf4;">Datos Filtrados</div>
+        <span style="margin-left:auto;font-size:12px;color:#3d6b4a;">Usá los filtros de arriba para refinar</span>
     </div>
-    <div style="font-size:13px;color:#3d6b4a;">Fuente: Transfermarkt · {total_jugadores} jugadores · {total_clubs} clubes · {total_temporadas} temporadas</div>
-    <div style="font-size:12px;color:#2a4d33;">Dashboard estadístico · Primera División Argentina</div>
-</footer>
-""", height=80)
+    """, 42)
+
+    # Like the tabs, a closed expander renders nothing in lazy mode.
+    datos = st.expander("Ver datos completos filtrados", key='datos', on_change='rerun' if LAZY_TABS else 'ignore')
+    if datos.open is not False:
+        with datos, profiler.stage('datos'):
+            render_data_table(result)
+            render_export(result)
+
+    if st.query_params.get('debug'):
+        cache_stats = get_figure_cache().stats()
+        st.caption(
+            f"Cache de gráficos · {cache_stats['hits']} aciertos · {cache_stats['misses']} fallos · "
+            f"{cache_stats['entries']} figuras · {cache_stats['bytes'] / 1e6:.1f} / {cache_stats['max_bytes'] / 1e6:.0f} MB"
+        )
+
+    if profiler.enabled:
+        render_profile()
+    if profiler.kind == 'fragment':
+        profiler.finish()
+
+
+render_analysis()
+
+
+# ─── FOOTER ───
+render_html('footer', static_html['footer'], 80)
+profiler.finish()
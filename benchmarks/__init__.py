@@ -0,0 +1 @@
+"""Reproducible performance benchmarks for the engine on synthetic player tables."""
@@ -0,0 +1,213 @@
+"""Times loading, filtering, tab aggregations, figure building and exports on synthetic data.
+
+    python -m benchmarks.run --scales 10 100 1000 --repeat 3 --output bench.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+import plotly
+import pyarrow
+
+from engine import Dataset, Filters, build_cube, query
+from engine.figures import (
+    BLUE_AR, GOLD, GREEN_ACCENT, fig_altura_pos, fig_edad_altura, fig_edad_hist, fig_edad_valor, fig_heatmap,
+    fig_pie, fig_procedencia, fig_ranking, fig_top_players, fig_trend, fig_valor_box,
+)
+from engine.export import EXPORT_FORMATS, export_rows
+from engine.indexes import build_filter_index, build_name_index
+from engine.sql import SQLTable
+from engine.storage import convert_data, read_arrow, write_arrow
+
+from .synthetic import generate, read_base
+
+# Charts per dashboard tab: (chart id, builder, series name or None for the matching rows, extra builder args).
+# Mirrors the render_* functions in Dashboard.py.
+TABS = {
+    'perfil': [
+        ('edad_hist', fig_edad_hist, 'edad_hist', ()),
+        ('pie', fig_pie, 'pie', ()),
+        ('altura_pos', fig_altura_pos, 'altura_pos', ()),
+        ('edad_altura', fig_edad_altura, None, ()),
+    ],
+    'valor': [
+        ('top_players', fig_top_players, None, ()),
+        ('valor_box', fig_valor_box, None, ()),
+        ('valor_club', fig_ranking, 'valor_club', (GREEN_ACCENT, 'rgba(74,222,128,0.25)', 340)),
+        ('edad_valor', fig_edad_valor, None, ()),
+    ],
+    'equipos': [
+        ('pos_club', fig_heatmap, 'pos_club', ([[0, '#060e0a'], [0.3, '#14532d'], [0.6, '#22c55e'], [1, '#4ade80']], 380)),
+        ('jug_club', fig_ranking, 'jug_club', (GREEN_ACCENT, 'rgba(74,222,128,0.25)', 340)),
+        ('eq_ant', fig_ranking, 'eq_ant', ('#a78bfa', 'rgba(167,139,250,0.3)', 380)),
+        ('procedencia', fig_procedencia, 'procedencia', ()),
+    ],
+    'evolucion': [
+        ('valor_temp', fig_trend, 'valor_temp', (GREEN_ACCENT, 'rgba(74,222,128,0.08)', 8,
+                                                 'Temporada: %{x}<br>Valor: $%{y:,.0f}<extra></extra>', 320)),
+        ('edad_temp', fig_trend, 'edad_temp', (BLUE_AR, 'rgba(116,172,223,0.08)', 7,
+                                               'Temporada: %{x}<br>Edad: %{y:.1f} años<extra></extra>', 320)),
+        ('fichajes', fig_trend, 'fichajes', (GOLD, 'rgba(251,191,36,0.08)', 7,
+                                             'Año: %{x}<br>Fichajes: %{y}<extra></extra>', 280)),
+        ('temp_club', fig_heatmap, 'temp_club', ([[0, '#060e0a'], [0.3, '#7f1d1d'], [0.6, '#dc2626'], [1, '#fbbf24']], 280)),
+    ],
+}
+KPIS = ['jugadores', 'valor_prom', 'edad_prom', 'clubs']
+
+
+def scenarios(dataset):
+    # Representative filter combinations, picked from the data so every scale has matches.
+    options = dataset.filter_options
+    return {
+        'todos': Filters(),
+        'club': Filters(clubs=tuple(options['Club'][:1])),
+        'club_temporada': Filters(clubs=tuple(options['Club'][:2]), seasons=tuple(options['Temporada'][-1:])),
+        'posicion': Filters(positions=tuple(options['Posicion'][:1])),
+        'busqueda': Filters(search='martinez'),
+        'busqueda_aprox': Filters(search='rikelme'),
+    }
+
+
+def measure(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        value = fn()
+        times.append(time.perf_counter() - start)
+    return times, value
+
+
+class Recorder:
+
+    def __init__(self, repeat):
+        self.repeat = repeat
+        self.results = []
+        self.context = {}
+
+    def run(self, stage, name, fn, scenario=None, size=None):
+        # Times `fn` and records min/median seconds. `size` turns the last return
+        # value into a payload size in bytes (figure JSON, export file).
+        times, value = measure(fn, self.repeat)
+        record = dict(self.context, stage=stage, name=name, scenario=scenario,
+                      min_s=min(times), median_s=statistics.median(times), times_s=times)
+        if size is not None:
+            record['bytes'] = size(value)
+        self.results.append(record)
+        label = f"{stage}/{name}" + (f" [{scenario}]" if scenario else '')
+        print(f"  {label:<44} {record['median_s'] * 1000:10.1f} ms", file=sys.stderr)
+        return value
+
+
+def bench_scale(recorder, base, scale, seed, workdir, backend='pandas'):
+    raw = generate(base, scale, seed)
+    recorder.context = {'scale': scale, 'rows': len(raw)}
+    print(f"scale {scale}x · {len(raw):,} rows", file=sys.stderr)
+
+    # load_data: the workbook conversion on a cold cache, then the Arrow cache round trip
+    # through the same single-batch write and memory-mapped, zero-copy read the
+    # dashboard uses.
+    df = recorder.run('load', 'convert', lambda: convert_data(raw.copy()))
+    arrow_path = os.path.join(workdir, f"bench-{scale}.arrow")
+    recorder.run('load', 'arrow_write', lambda: write_arrow(df, arrow_path))
+    df = recorder.run('load', 'arrow_read', lambda: read_arrow(arrow_path))
+    raw = None  # the raw strings are not needed past this point
+
+    recorder.run('index', 'filter', lambda: build_filter_index(df))
+    recorder.run('index', 'name', lambda: build_name_index(df))
+    recorder.run('index', 'cube', lambda: build_cube(df))
+    # Built once more outside the timings so the queries below only measure lookups.
+    dataset = Dataset(df, f"bench-{scale}")
+    dataset.filter_index, dataset.name_index, dataset.cube
+    if backend == 'duckdb':
+        recorder.run('index', 'sql_table', lambda: SQLTable(df))
+        dataset.sql_table
+
+    for scenario, filters in scenarios(dataset).items():
+        recorder.context['matches'] = len(query(dataset, filters, backend).rows)
+        # Filter chain: index lookups plus taking the matching rows.
+        result = recorder.run('filter', 'query', lambda: query(dataset, filters, backend), scenario)
+        # Series are memoized per result, so every run starts from a fresh query; subtract
+        # filter/query to get the aggregation alone.
+        recorder.run('aggregate', 'kpis', lambda: [query(dataset, filters, backend).series[k] for k in KPIS], scenario)
+        for tab, charts in TABS.items():
+            keys = [series for _, _, series, _ in charts if series]
+            recorder.run('aggregate', tab, lambda: [query(dataset, filters, backend).series[k] for k in keys], scenario)
+            for chart_id, builder, series, options in charts:
+                data = result.rows if series is None else result.series[series]
+                recorder.run('figure', chart_id, lambda: _figure_json(builder, data, options), scenario, size=len)
+        for fmt in EXPORT_FORMATS:
+            recorder.run('export', fmt, lambda: export_rows(result.dataset.df, fmt, result.row_ids), scenario,
+                         size=_file_size)
+        del recorder.context['matches']
+
+
+def _file_size(fh):
+    with fh:
+        return os.fstat(fh.fileno()).st_size
+
+
+def _figure_json(builder, data, options):
+    # What the dashboard does on a figure cache miss.
+    fig = builder(data, *options)
+    return '' if fig is None else fig.to_json()
+
+
+def environment(args, base_rows):
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'pyarrow': pyarrow.__version__,
+        'plotly': plotly.__version__,
+        'backend': args.backend,
+        'seed': args.seed,
+        'repeat': args.repeat,
+        'base_rows': base_rows,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scales', type=float, nargs='+', default=[10, 100, 1000],
+                        help="multiples of the bundled workbook's row count (default: 10 100 1000)")
+    parser.add_argument('--repeat', type=int, default=3, help='runs per measurement; min and median are reported')
+    parser.add_argument('--seed', type=int, default=0, help='seed for the synthetic generator')
+    parser.add_argument('--backend', choices=['pandas', 'duckdb'], default='pandas',
+                        help='query backend to measure (duckdb needs the duckdb package)')
+    parser.add_argument('--output', help='write the JSON results here instead of stdout')
+    args = parser.parse_args(argv)
+
+    base = read_base()
+    recorder = Recorder(args.repeat)
+    with tempfile.TemporaryDirectory(prefix='dashboard-bench-') as workdir:
+        for scale in args.scales:
+            bench_scale(recorder, base, int(scale) if scale == int(scale) else scale, args.seed, workdir, args.backend)
+
+    report = {'environment': environment(args, len(base)), 'results': recorder.results}
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as fh:
+            json.dump(report, fh, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        sys.stdout.write('\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,40 @@
+"""Synthetic player tables at a multiple of the bundled workbook's size."""
+import math
+
+import numpy as np
+import pandas as pd
+
+from engine.storage import DATA_FILE
+
+COLUMNS = ['Jugadores', 'Club', 'Posicion', 'Pie', 'Equipo Anterior', 'Valor de mercado', 'Edad', 'Altura',
+           'Temporada', 'Fichado']
+
+
+def read_base(path=DATA_FILE):
+    # Raw workbook rows, before convert_data, so the load benchmark parses the same strings.
+    return pd.read_excel(path)[COLUMNS]
+
+
+def generate(base, scale, seed=0):
+    # Bootstraps `scale` times as many rows from `base`, so every column keeps its
+    # joint distribution (age/height/value by position, seasons, transfer dates).
+    # Rows are spread over ceil(sqrt(scale)) copies of the league: club cardinality
+    # grows with the data the way extra leagues would, but slower than the row count.
+    # Names recombine first and last names across rows so the search index sees
+    # many more distinct players.
+    rng = np.random.default_rng(seed)
+    n = int(len(base) * scale)
+    picks = rng.integers(0, len(base), n)
+    df = base.iloc[picks].reset_index(drop=True)
+
+    leagues = math.ceil(math.sqrt(scale))
+    league = rng.integers(0, leagues, n)
+    clubs = df['Club'].astype(str)
+    df['Club'] = clubs.where(league == 0, clubs + ' ' + pd.Series(league, dtype=str).radd('L')).where(df['Club'].notna())
+
+    names = base['Jugadores'].astype(str).str.split(' ', n=1)
+    first = names.str[0].to_numpy()
+    last = names.str[1].fillna('').to_numpy()
+    df['Jugadores'] = pd.Series(first[picks]) + ' ' + pd.Series(last[rng.integers(0, len(base), n)])
+    df['Jugadores'] = df['Jugadores'].str.strip()
+    return df
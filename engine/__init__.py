@@ -0,0 +1,62 @@
+"""Headless analytics engine behind the Fútbol Argentino dashboard."""
+import importlib
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .cube import build_cube, cube_series
+    from .querying import (
+        PAGE_SIZE, Dataset, Filters, PartitionedDataset, QueryResult, QueryState, load_dataset, page_rows, query,
+        refresh_dataset,
+    )
+    from .storage import DATA_FILE, file_signature, ingest_segment, write_partitioned
+
+# Exported name -> submodule. They are imported on first access, so light submodules
+# such as engine.profiling load without pulling in pandas.
+_EXPORTS = {
+    'DATA_FILE': 'storage',
+    'PAGE_SIZE': 'querying',
+    'Dataset': 'querying',
+    'Filters': 'querying',
+    'PartitionedDataset': 'querying',
+    'QueryResult': 'querying',
+    'QueryState': 'querying',
+    'build_cube': 'cube',
+    'cube_series': 'cube',
+    'file_signature': 'storage',
+    'ingest_segment': 'storage',
+    'load_dataset': 'querying',
+    'page_rows': 'querying',
+    'query': 'querying',
+    'refresh_dataset': 'querying',
+    'write_partitioned': 'storage',
+}
+
+__all__ = [
+    'DATA_FILE',
+    'PAGE_SIZE',
+    'Dataset',
+    'Filters',
+    'PartitionedDataset',
+    'QueryResult',
+    'QueryState',
+    'build_cube',
+    'cube_series',
+    'file_signature',
+    'ingest_segment',
+    'load_dataset',
+    'page_rows',
+    'query',
+    'refresh_dataset',
+    'write_partitioned',
+]
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    submodule = importlib.import_module(f".{_EXPORTS[name]}", __name__)
+    # Bind every export of the submodule at once. The submodule is not named after
+    # any export, so importing it never shadows one (engine.query is the function).
+    globals().update({export: getattr(submodule, export)
+                      for export, source in _EXPORTS.items() if source == _EXPORTS[name]})
+    return globals()[name]
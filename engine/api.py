@@ -0,0 +1,276 @@
+"""Local HTTP API serving the dashboard's totals, series and filtered rows as JSON or Arrow.
+
+    python -m engine.api [--data futbolargentino.xlsx] [--host 127.0.0.1] [--port 8502]
+
+    GET /summary                   hero totals and clubs_stats
+    GET /options                   values the club, season and position filters accept
+    GET /series                    names of the KPI values and chart series
+    GET /series/<name>             one of them for the filters
+    GET /rows                      one page of the matching rows (page, page_size, sort, desc)
+
+Filters are the dashboard's: `club`, `season` and `position` (repeatable) and `search`.
+Tables come as JSON in pandas' 'split' layout, or as an Arrow IPC stream with
+`format=arrow`. Every response has an ETag derived from the data version and the
+normalized request, so `If-None-Match` is answered with 304, and encoded bodies are
+kept in an LRU so a repeated request does not run the query again.
+"""
+import argparse
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+import threading
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from .figures import FigureCache
+from .querying import PAGE_SIZE, Filters, page_rows, query, refresh_dataset
+from .storage import DATA_FILE
+
+API_CACHE_MB = float(os.environ.get('DASHBOARD_API_CACHE_MB', '64'))
+MAX_PAGE_SIZE = 10_000
+# Smaller bodies are sent as they are; gzip would save next to nothing.
+GZIP_MIN_BYTES = 1024
+# JSON and Arrow streams never start with these, so cached bodies tell their encoding.
+GZIP_MAGIC = b'\x1f\x8b'
+CONTENT_TYPES = {'json': 'application/json; charset=utf-8', 'arrow': 'application/vnd.apache.arrow.stream'}
+REASONS = {200: 'OK', 304: 'Not Modified', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+           500: 'Internal Server Error'}
+
+
+class HTTPError(Exception):
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def json_value(value):
+    # pandas objects in the 'split' layout, numpy scalars as plain numbers, NaN as null.
+    if isinstance(value, (pd.Series, pd.DataFrame)):
+        return json.loads(value.to_json(orient='split', date_format='iso'))
+    if isinstance(value, dict):
+        return {key: json_value(item) for key, item in value.items()}
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and np.isnan(value):
+        return None
+    return value
+
+
+def encode_json(value):
+    return json.dumps(json_value(value), ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def encode_arrow(value, keep_index=True):
+    # A Series or DataFrame as an Arrow IPC stream, its index (when meaningful) as columns.
+    if isinstance(value, pd.Series):
+        value = value.to_frame(value.name if value.name is not None else 'value')
+    if not isinstance(value, pd.DataFrame):
+        raise HTTPError(400, "format=arrow is only available for tables; use format=json")
+    frame = value.reset_index() if keep_index else value
+    frame.columns = [str(col) for col in frame.columns]
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def parse_filters(params):
+    try:
+        seasons = tuple(int(season) for season in params.get('season', []))
+    except ValueError:
+        raise HTTPError(400, "season must be an integer") from None
+    search = params.get('search', [''])[-1]
+    return Filters(search, tuple(params.get('club', [])), seasons, tuple(params.get('position', [])))
+
+
+def int_param(params, name, default, low, high):
+    try:
+        value = int(params.get(name, [default])[-1])
+    except ValueError:
+        raise HTTPError(400, f"{name} must be an integer") from None
+    if not low <= value <= high:
+        raise HTTPError(400, f"{name} must be between {low} and {high}")
+    return value
+
+
+class QueryAPI:
+    # Request handling, independent of the HTTP transport: the dataset kept up to date
+    # like the dashboard's, and the response cache shared by every connection.
+
+    def __init__(self, path=DATA_FILE, cache_mb=API_CACHE_MB):
+        self.path = path
+        self.dataset = None
+        self.lock = threading.Lock()
+        # The figure cache's byte-bounded LRU, holding encoded response bodies here.
+        self.cache = FigureCache(int(cache_mb * 1024 * 1024))
+
+    def current_dataset(self):
+        # Only the very first load makes requests wait; while a newer version is loaded
+        # and warmed, other requests keep answering from the previous one.
+        if not self.lock.acquire(blocking=self.dataset is None):
+            return self.dataset
+        try:
+            dataset = refresh_dataset(self.dataset, self.path)
+            if dataset is not self.dataset:
+                self.dataset = dataset.warm()
+            return self.dataset
+        finally:
+            self.lock.release()
+
+    def handle(self, method, target, headers):
+        # Returns (status, headers, body) for one request.
+        try:
+            if method not in ('GET', 'HEAD'):
+                raise HTTPError(405, f"{method} is not supported")
+            url = urlsplit(target)
+            route = unquote(url.path).rstrip('/') or '/'
+            params = parse_qs(url.query)
+            fmt = params.get('format', ['json'])[-1]
+            if fmt not in CONTENT_TYPES:
+                raise HTTPError(400, f"format must be one of {', '.join(CONTENT_TYPES)}")
+            dataset = self.current_dataset()
+            build, request_key = self.resolve(dataset, route, params, fmt)
+        except HTTPError as error:
+            return error.status, {'Content-Type': CONTENT_TYPES['json']}, encode_json({'error': str(error)})
+
+        digest = hashlib.sha256(json.dumps([dataset.version, route, fmt, request_key], default=str).encode())
+        # Gzipped bodies are a different representation, so they get their own ETag.
+        etag = f'"{digest.hexdigest()[:32]}"'
+        gzip_etag = f'"{digest.hexdigest()[:32]}-gzip"'
+        accepts_gzip = 'gzip' in headers.get('accept-encoding', '')
+        response_headers = {'Cache-Control': 'no-cache', 'Vary': 'Accept-Encoding', 'Content-Type': CONTENT_TYPES[fmt]}
+        # If-None-Match uses the weak comparison, so W/ tags from proxies still match.
+        sent = {tag.strip().removeprefix('W/') for tag in headers.get('if-none-match', '').split(',')}
+        for tag in (gzip_etag, etag) if accepts_gzip else (etag,):
+            if tag in sent:
+                response_headers['ETag'] = tag
+                return 304, response_headers, b''
+
+        body = self.cache.get((etag, accepts_gzip))
+        if body is None:
+            try:
+                body = build()
+            except HTTPError as error:
+                return error.status, {'Content-Type': CONTENT_TYPES['json']}, encode_json({'error': str(error)})
+            if accepts_gzip and len(body) >= GZIP_MIN_BYTES:
+                body = gzip.compress(body, compresslevel=6)
+            self.cache.put((etag, accepts_gzip), body)
+        response_headers['ETag'] = etag
+        if body[:2] == GZIP_MAGIC:
+            response_headers['ETag'] = gzip_etag
+            response_headers['Content-Encoding'] = 'gzip'
+        return 200, response_headers, body
+
+    def resolve(self, dataset, route, params, fmt):
+        # The body builder for `route` plus the normalized parameters it depends on.
+        # Parameters are validated here, before the ETag and cache lookups.
+        encode = encode_arrow if fmt == 'arrow' else encode_json
+        if route == '/summary':
+            if fmt == 'arrow':
+                return lambda: encode_arrow(dataset.summary['clubs_stats'], keep_index=False), None
+            return lambda: encode_json(dataset.summary), None
+        if route == '/options':
+            return lambda: encode(dataset.filter_options), None
+        if route == '/series':
+            return lambda: encode(list(query(dataset, Filters()).series.builders)), None
+        filters = parse_filters(params)
+        if route.startswith('/series/'):
+            name = route[len('/series/'):]
+
+            def series():
+                result = query(dataset, filters)
+                if name not in result.series.builders:
+                    raise HTTPError(404, f"unknown series {name!r}")
+                return encode(result.series[name])
+
+            return series, [name, filters.key()]
+        if route == '/rows':
+            page = int_param(params, 'page', 0, 0, np.iinfo(np.int32).max)
+            page_size = int_param(params, 'page_size', PAGE_SIZE, 1, MAX_PAGE_SIZE)
+            sort_by = params.get('sort', [None])[-1]
+            columns = dataset.columns if dataset.partitioned else dataset.df.columns
+            if sort_by is not None and sort_by not in columns:
+                raise HTTPError(400, f"unknown sort column {sort_by!r}")
+            ascending = params.get('desc', ['0'])[-1] in ('0', 'false')
+
+            def rows():
+                frame = page_rows(query(dataset, filters), sort_by, ascending, page, page_size)
+                if fmt == 'arrow':
+                    return encode_arrow(frame, keep_index=False)
+                return encode_json(frame.reset_index(drop=True))
+
+            return rows, [filters.key(), page, page_size, sort_by, ascending]
+        raise HTTPError(404, f"unknown route {route!r}")
+
+
+async def serve_connection(api, reader, writer):
+    # HTTP/1.1 with keep-alive. The request itself runs on the default thread pool so
+    # the event loop keeps accepting and answering other connections meanwhile.
+    loop = asyncio.get_running_loop()
+    try:
+        while True:
+            request_line = await reader.readline()
+            if not request_line.strip():
+                break
+            method, target, version = request_line.decode('latin-1').split()
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b'\n', b''):
+                    break
+                name, _, value = line.decode('latin-1').partition(':')
+                headers[name.strip().lower()] = value.strip()
+            try:
+                status, response_headers, body = await loop.run_in_executor(None, api.handle, method, target, headers)
+            except Exception as error:
+                status, response_headers, body = 500, {'Content-Type': CONTENT_TYPES['json']}, encode_json(
+                    {'error': f"{type(error).__name__}: {error}"})
+            keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+            response_headers['Content-Length'] = str(len(body))
+            response_headers['Connection'] = 'keep-alive' if keep_alive else 'close'
+            head = f"HTTP/1.1 {status} {REASONS[status]}\r\n" + ''.join(
+                f"{name}: {value}\r\n" for name, value in response_headers.items()) + '\r\n'
+            writer.write(head.encode('latin-1') + (b'' if method == 'HEAD' else body))
+            await writer.drain()
+            if not keep_alive:
+                break
+    except (ConnectionError, ValueError):
+        # Dropped connections and malformed request lines just end the connection.
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(api, host, port):
+    server = await asyncio.start_server(lambda reader, writer: serve_connection(api, reader, writer), host, port)
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--data', default=os.environ.get('DASHBOARD_DATA', DATA_FILE),
+                        help=f"workbook or partitioned directory to serve (default: {DATA_FILE})")
+    parser.add_argument('--host', default='127.0.0.1', help='interface to listen on (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8502, help='port to listen on (default: 8502)')
+    args = parser.parse_args(argv)
+
+    api = QueryAPI(args.data)
+    # Load and warm before listening, so the first requests are not the slow ones.
+    api.current_dataset()
+    print(f"API en http://{args.host}:{args.port} · datos {api.dataset.version}")
+    try:
+        asyncio.run(serve(api, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""Player career timelines, the Equipo Anterior → Club transfer graph and the youth flag."""
+import numpy as np
+import pandas as pd
+
+YOUTH_MARKER = 'Inferiores'
+
+
+def youth_flags(previous_teams):
+    # Whether each row's Equipo Anterior is a youth academy. Categorical columns are
+    # checked once per category and mapped through the codes, not string by string.
+    if not isinstance(previous_teams.dtype, pd.CategoricalDtype):
+        return previous_teams.astype(object).str.contains(YOUTH_MARKER, na=False)
+    flags = np.append(previous_teams.cat.categories.str.contains(YOUTH_MARKER), False)
+    # Missing values (code -1) land on the trailing False.
+    return pd.Series(flags[previous_teams.cat.codes.to_numpy()], index=previous_teams.index)
+
+
+def _csr(keys, n_keys):
+    # Stable order grouping `keys`, plus offsets so group k is order[offsets[k]:offsets[k + 1]].
+    order = np.argsort(keys, kind='stable')
+    return order, np.searchsorted(keys[order], np.arange(n_keys + 1))
+
+
+def build_career_index(df):
+    # Built once per data version:
+    #   players/timeline_order/timeline_offsets: each player's rows, season by season;
+    #   nodes, node_youth: every club and previous team, and whether it is an academy;
+    #   out_* / in_*: the transfer graph as CSR adjacency by origin and by destination,
+    #   weighted by distinct transfers (player, origin, club, signing date), since a
+    #   player's row repeats for every season spent at the club.
+    player_codes, players = pd.factorize(df['Jugadores'])
+    seasons = df['Temporada'].to_numpy(dtype='float64', na_value=np.inf)
+    timeline_order = np.lexsort((seasons, player_codes))
+    timeline_order = timeline_order[player_codes[timeline_order] >= 0]
+    timeline_offsets = np.searchsorted(player_codes[timeline_order], np.arange(len(players) + 1))
+
+    nodes = pd.Index(sorted(set(df['Club'].cat.categories) | set(df['Equipo Anterior'].cat.categories)))
+    club_nodes = np.append(nodes.get_indexer(df['Club'].cat.categories), -1)
+    origin_nodes = np.append(nodes.get_indexer(df['Equipo Anterior'].cat.categories), -1)
+    moves = pd.DataFrame({
+        'player': player_codes,
+        'origin': origin_nodes[df['Equipo Anterior'].cat.codes.to_numpy()],
+        'club': club_nodes[df['Club'].cat.codes.to_numpy()],
+        'fichado': df['Fichado'].to_numpy().view('int64'),
+    })
+    moves = moves[(moves['player'] >= 0) & (moves['origin'] >= 0) & (moves['club'] >= 0)].drop_duplicates()
+    edges = moves.groupby(['origin', 'club']).size()
+    origins = edges.index.get_level_values('origin').to_numpy(dtype=np.int32)
+    clubs = edges.index.get_level_values('club').to_numpy(dtype=np.int32)
+    weights = edges.to_numpy(dtype=np.int32)
+    out_order, out_offsets = _csr(origins, len(nodes))
+    in_order, in_offsets = _csr(clubs, len(nodes))
+    return {
+        'players': pd.Index(players),
+        'timeline_order': timeline_order,
+        'timeline_offsets': timeline_offsets,
+        'nodes': nodes,
+        'node_youth': np.asarray(nodes.str.contains(YOUTH_MARKER), dtype=bool),
+        'out_offsets': out_offsets,
+        'out_targets': clubs[out_order],
+        'out_weights': weights[out_order],
+        'in_offsets': in_offsets,
+        'in_sources': origins[in_order],
+        'in_weights': weights[in_order],
+    }
+
+
+def player_timeline(index, df, player):
+    # The player's rows ordered by season; empty when the name is unknown.
+    position = index['players'].get_indexer([player])[0]
+    if position < 0:
+        return df.iloc[:0]
+    start, end = index['timeline_offsets'][position], index['timeline_offsets'][position + 1]
+    return df.take(index['timeline_order'][start:end])
+
+
+def transfer_flows(index, clubs=(), limit=15):
+    # Heaviest Equipo Anterior → Club edges, into `clubs` when given, else overall.
+    if clubs:
+        targets = index['nodes'].get_indexer(list(clubs))
+        targets = targets[targets >= 0]
+        starts, ends = index['in_offsets'][targets], index['in_offsets'][targets + 1]
+        edges = np.concatenate([np.arange(start, end) for start, end in zip(starts, ends)] + [np.arange(0)])
+        sources, weights = index['in_sources'][edges], index['in_weights'][edges]
+        destinations = np.repeat(targets, ends - starts)
+    else:
+        sources = np.repeat(np.arange(len(index['nodes'])), np.diff(index['out_offsets']))
+        destinations, weights = index['out_targets'], index['out_weights']
+    top = np.lexsort((sources, -weights))[:limit]
+    nodes = index['nodes']
+    return pd.DataFrame({
+        'Equipo Anterior': nodes[sources[top]],
+        'Club': nodes[destinations[top]],
+        'Fichajes': weights[top],
+        'Inferiores': index['node_youth'][sources[top]],
+    })
@@ -0,0 +1,78 @@
+"""Compact binary encoding of the cube, for cross-filtering KPI cards and charts in the browser.
+
+Layout: a little-endian uint32 header length, the UTF-8 JSON header, then every
+column as a little-endian typed array starting at a multiple of 8 bytes, so the
+browser can view each one in place. The header holds the labels the codes refer to
+and, per table, its row count and columns as {name: [dtype, offset]}. The tables are
+the cube's cells (dimension codes, counts and sums) and one count table per
+PAYLOAD_DETAILS dimension the cube has, whose `cell` column points into the cells.
+Codes are -1 for missing values. The whole payload is gzipped.
+"""
+import gzip
+import json
+
+import numpy as np
+import pandas as pd
+
+from .cube import CUBE_DIMS, CUBE_MEASURES
+
+# Breakdowns the browser needs beyond the cells: age histogram, signing years,
+# previous teams and the youth academy share. Partitioned cubes have none of them.
+PAYLOAD_DETAILS = ['Edad', 'Año Fichaje', 'Equipo Anterior', 'Inferiores']
+
+
+def _labels(values):
+    # Sorted distinct non-missing values, as plain Python values.
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return values.cat.categories.tolist()
+    return sorted(pd.unique(values.dropna()).tolist())
+
+
+def _codes(values, labels):
+    codes = pd.Index(labels).get_indexer(values.astype(object).where(values.notna(), None))
+    dtype = np.int8 if len(labels) < 2 ** 7 else np.int16 if len(labels) < 2 ** 15 else np.int32
+    return codes.astype(dtype)
+
+
+def _cell_keys(table, labels):
+    # One int64 per row identifying its (Club, Temporada, Posicion, Pie) cell.
+    keys = np.zeros(len(table), dtype=np.int64)
+    for dim in CUBE_DIMS:
+        keys = keys * (len(labels[dim]) + 1) + _codes(table[dim], labels[dim]).astype(np.int64) + 1
+    return keys
+
+
+def cube_payload(cube):
+    cells = cube['cells']
+    details = {dim: cube['details'][dim] for dim in PAYLOAD_DETAILS if dim in cube['details']}
+    labels = {dim: _labels(cells[dim]) for dim in CUBE_DIMS}
+    labels.update({dim: _labels(detail[dim]) for dim, detail in details.items()})
+
+    tables = {'cells': {dim: _codes(cells[dim], labels[dim]) for dim in CUBE_DIMS}}
+    tables['cells']['n'] = cells['n'].to_numpy(dtype=np.uint32)
+    for name in CUBE_MEASURES:
+        tables['cells'][f'{name}_sum'] = cells[f'{name}_sum'].to_numpy(dtype=np.float64)
+        tables['cells'][f'{name}_n'] = cells[f'{name}_n'].to_numpy(dtype=np.uint32)
+    cell_index = pd.Index(_cell_keys(cells, labels))
+    for dim, detail in details.items():
+        tables[dim] = {
+            'cell': cell_index.get_indexer(_cell_keys(detail, labels)).astype(np.int32),
+            'value': _codes(detail[dim], labels[dim]),
+            'n': detail['n'].to_numpy(dtype=np.uint32),
+        }
+
+    header = {'labels': labels, 'tables': {}}
+    buffers, offset = [], 0
+    for table_name, columns in tables.items():
+        layout = header['tables'][table_name] = {'rows': len(next(iter(columns.values()))), 'columns': {}}
+        for name, values in columns.items():
+            data = np.ascontiguousarray(values, dtype=values.dtype.newbyteorder('<')).tobytes()
+            layout['columns'][name] = [values.dtype.name, offset]
+            padding = -len(data) % 8
+            buffers.append(data + b'\0' * padding)
+            offset += len(data) + padding
+    header_bytes = json.dumps(header, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    # The columns start 8-byte aligned after the length prefix and the header.
+    header_bytes += b' ' * (-(4 + len(header_bytes)) % 8)
+    raw = len(header_bytes).to_bytes(4, 'little') + header_bytes + b''.join(buffers)
+    return gzip.compress(raw, compresslevel=6, mtime=0)
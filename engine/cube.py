@@ -0,0 +1,164 @@
+"""Aggregate cube of partial counts and sums behind the KPI cards and aggregate charts."""
+import numpy as np
+import pandas as pd
+
+from .careers import youth_flags
+from .sketches import SKETCHES, build_sketches, distinct_count, merge_sketches, quantile_box
+
+CUBE_DIMS = ['Club', 'Temporada', 'Posicion', 'Pie']
+CUBE_MEASURES = {'valor': 'Valor de mercado', 'edad': 'Edad', 'altura': 'Altura'}
+# Charts that need one more breakdown get their own count table over CUBE_DIMS + [dim].
+CUBE_DETAILS = ['Edad', 'Año Fichaje', 'Equipo Anterior', 'Inferiores']
+# Sketches only need the dimensions the filters select on.
+SKETCH_DIMS = ['Club', 'Temporada', 'Posicion']
+
+
+def build_cube(df, sketches=None):
+    # Partial counts and sums per (Club, Temporada, Posicion, Pie) cell. Every chart
+    # except the row-level ones (scatters, box, top players) is a sum over these cells.
+    # In sketch mode each cell also gets quantile and distinct-count sketches, which
+    # turn the box plot and the distinct players count into cell merges too.
+    frame = df[CUBE_DIMS + ['Edad', 'Año Fichaje', 'Equipo Anterior']].copy()
+    frame['Inferiores'] = youth_flags(frame['Equipo Anterior'])
+    for name, col in CUBE_MEASURES.items():
+        values = df[col].astype('float64')
+        frame[f'{name}_sum'] = values
+        frame[f'{name}_n'] = values.notna().astype('int64')
+    grouped = frame.groupby(CUBE_DIMS, observed=True, dropna=False)
+    cells = grouped.size().rename('n').to_frame()
+    for name in CUBE_MEASURES:
+        cells[f'{name}_sum'] = grouped[f'{name}_sum'].sum()
+        cells[f'{name}_n'] = grouped[f'{name}_n'].sum()
+    details = {
+        dim: frame.groupby(CUBE_DIMS + [dim], observed=True, dropna=False).size().rename('n').reset_index()
+        for dim in CUBE_DETAILS
+    }
+    cube = {'cells': cells.reset_index(), 'details': details}
+    if sketches is None:
+        sketches = SKETCHES
+    if sketches:
+        cube['sketches'] = build_sketches(df, SKETCH_DIMS)
+    return cube
+
+
+def _merge_counts(tables, keys, dtypes):
+    tables = [table.astype({col: dtype for col, dtype in dtypes.items() if col in table}) for table in tables]
+    frame = pd.concat(tables, ignore_index=True)
+    return frame.groupby(keys, observed=True, dropna=False).sum().reset_index()
+
+
+def extend_cube(cube, delta, dtypes):
+    # Cube of the table with `delta` appended: the new rows are grouped on their own
+    # and summed into the existing cells. `dtypes` are the combined table's category
+    # dtypes, so old and new cells share codes.
+    delta_cube = build_cube(delta, 'sketches' in cube)
+    extended = {
+        'cells': _merge_counts([cube['cells'], delta_cube['cells']], CUBE_DIMS, dtypes),
+        'details': {
+            dim: _merge_counts([cube['details'][dim], delta_cube['details'][dim]], CUBE_DIMS + [dim], dtypes)
+            for dim in CUBE_DETAILS
+        },
+    }
+    if 'sketches' in cube:
+        extended['sketches'] = merge_sketches([cube['sketches'], delta_cube['sketches']], SKETCH_DIMS, dtypes)
+    return extended
+
+
+def shrink_cube(cube, removed):
+    # Cube of the rows left once `removed` (some of the cube's own rows) are dropped:
+    # the removed rows are grouped on their own and subtracted, and emptied cells go.
+    removed_cube = build_cube(removed, sketches=False)
+    measures = [f'{name}_{part}' for name in CUBE_MEASURES for part in ('sum', 'n')]
+    cells = _merge_counts([cube['cells'], removed_cube['cells'].assign(
+        **{col: -removed_cube['cells'][col] for col in ['n'] + measures})], CUBE_DIMS, {})
+    cells = cells[cells['n'] > 0].reset_index(drop=True)
+    for name in CUBE_MEASURES:
+        # Sums of cells left without values are exactly zero, not a rounding residue.
+        cells.loc[cells[f'{name}_n'] == 0, f'{name}_sum'] = 0.0
+    details = {}
+    for dim in CUBE_DETAILS:
+        removed_detail = removed_cube['details'][dim]
+        detail = _merge_counts([cube['details'][dim], removed_detail.assign(n=-removed_detail['n'])],
+                               CUBE_DIMS + [dim], {})
+        details[dim] = detail[detail['n'] > 0].reset_index(drop=True)
+    return {'cells': cells, 'details': details}
+
+
+def select_cells(table, selections):
+    mask = np.ones(len(table), dtype=bool)
+    for col, selected in selections.items():
+        if selected:
+            mask &= table[col].isin(selected).to_numpy()
+    return table[mask]
+
+
+def _mean_by(cells, dim, name):
+    grouped = cells.groupby(dim, observed=True)[[f'{name}_sum', f'{name}_n']].sum()
+    return (grouped[f'{name}_sum'] / grouped[f'{name}_n'].where(grouped[f'{name}_n'] > 0)).dropna()
+
+
+def _counts_by(cells, dim):
+    counts = cells.groupby(dim, observed=True)['n'].sum()
+    return counts[counts > 0].sort_values(ascending=False, kind='stable')
+
+
+def _crosstab(cells, rows, cols):
+    cells = cells.dropna(subset=[rows, cols])
+    return cells.groupby([rows, cols], observed=True)['n'].sum().unstack(fill_value=0)
+
+
+class LazySeries(dict):
+    # Each KPI value or chart series is computed on first access, so sections and
+    # figures that are not rendered (or come from the figure cache) cost nothing.
+
+    def __init__(self, builders):
+        super().__init__()
+        self.builders = builders
+
+    def __missing__(self, name):
+        value = self[name] = self.builders[name]()
+        return value
+
+
+def cube_series(cube, selections=None):
+    # Sums the selected cells into the KPI values and every aggregate chart series.
+    selections = selections or {}
+    cells = select_cells(cube['cells'], selections)
+
+    def detail(dim):
+        return select_cells(cube['details'][dim], selections)
+
+    def sketch(name):
+        return select_cells(cube['sketches'][name], selections)
+
+    def total_mean(name):
+        totals = series['totals']
+        return totals[f'{name}_sum'] / totals[f'{name}_n'] if totals[f'{name}_n'] > 0 else np.nan
+
+    series = LazySeries({
+        'totals': lambda: cells[['n'] + [f'{name}_{part}' for name in CUBE_MEASURES for part in ('sum', 'n')]].sum(),
+        'jugadores': lambda: int(series['totals']['n']),
+        'valor_prom': lambda: total_mean('valor'),
+        'edad_prom': lambda: total_mean('edad'),
+        'clubs': lambda: len(series['jug_club']),
+        'edad_hist': lambda: detail('Edad').groupby('Edad')['n'].sum().sort_index(),
+        'pie': lambda: _counts_by(cells, 'Pie'),
+        'altura_prom': lambda: total_mean('altura'),
+        'altura_pos': lambda: _mean_by(cells, 'Posicion', 'altura').sort_values(ascending=True),
+        'valor_club': lambda: cells[cells['Club'].notna()].groupby('Club', observed=True)['valor_sum'].sum()
+                      .loc[series['jug_club'].index].sort_values(ascending=True),
+        'pos_club': lambda: _crosstab(cells, 'Club', 'Posicion'),
+        'jug_club': lambda: _counts_by(cells, 'Club'),
+        'eq_ant': lambda: _counts_by(detail('Equipo Anterior'), 'Equipo Anterior').head(15),
+        'procedencia': lambda: _counts_by(detail('Inferiores'), 'Inferiores'),
+        'valor_temp': lambda: _mean_by(cells, 'Temporada', 'valor').sort_index(),
+        'edad_temp': lambda: _mean_by(cells, 'Temporada', 'edad').sort_index(),
+        'fichajes': lambda: detail('Año Fichaje').groupby('Año Fichaje')['n'].sum().pipe(lambda s: s[s > 0]).sort_index(),
+        'temp_club': lambda: _crosstab(cells, 'Temporada', 'Club'),
+    })
+    if 'sketches' in cube:
+        series.builders.update({
+            'valor_box': lambda: quantile_box(sketch('valor'), 'Posicion'),
+            'jugadores_distintos': lambda: distinct_count(sketch('jugadores')),
+        })
+    return series
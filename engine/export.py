@@ -0,0 +1,75 @@
+"""Chunked CSV, gzip CSV and Parquet exports of a query result."""
+import gzip
+import io
+import tempfile
+from typing import NamedTuple
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+EXPORT_CHUNK_ROWS = 50_000
+WRITE_BUFFER_BYTES = 1024 * 1024
+
+
+class ExportFormat(NamedTuple):
+    label: str
+    extension: str
+    mime: str
+
+
+EXPORT_FORMATS = {
+    'csv': ExportFormat('CSV', 'csv', 'text/csv'),
+    'csv.gz': ExportFormat('CSV comprimido', 'csv.gz', 'application/gzip'),
+    'parquet': ExportFormat('Parquet', 'parquet', 'application/vnd.apache.parquet'),
+}
+
+
+def iter_chunks(rows, row_ids=None, chunk_rows=EXPORT_CHUNK_ROWS):
+    # Chunks of `rows`, or of its rows at positions `row_ids`, taken one at a time so
+    # the match set is never copied as a whole.
+    if row_ids is None:
+        for start in range(0, len(rows), chunk_rows):
+            yield rows.iloc[start:start + chunk_rows]
+    else:
+        for start in range(0, len(row_ids), chunk_rows):
+            yield rows.take(row_ids[start:start + chunk_rows])
+
+
+def write_csv(rows, fh, row_ids=None, chunk_rows=EXPORT_CHUNK_ROWS):
+    # Same output as rows.to_csv(index=False), encoded one chunk at a time.
+    text = io.TextIOWrapper(fh, encoding='utf-8', newline='')
+    rows.iloc[:0].to_csv(text, index=False)
+    for chunk in iter_chunks(rows, row_ids, chunk_rows):
+        chunk.to_csv(text, index=False, header=False)
+    text.flush()
+    text.detach()
+
+
+def write_parquet(rows, fh, row_ids=None, chunk_rows=EXPORT_CHUNK_ROWS):
+    schema = pa.Schema.from_pandas(rows.iloc[:0], preserve_index=False)
+    with pq.ParquetWriter(fh, schema, compression='zstd') as writer:
+        for chunk in iter_chunks(rows, row_ids, chunk_rows):
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+
+
+def export_rows(rows, fmt, row_ids=None, chunk_rows=EXPORT_CHUNK_ROWS):
+    # Writes the file for EXPORT_FORMATS[fmt] from `rows` (only those at `row_ids`,
+    # when given) to an anonymous temporary file and returns it rewound. Only one
+    # chunk is ever converted at a time and the output never sits in RAM; the file
+    # is unbuffered (a RawIOBase), which st.download_button reads as binary data.
+    raw = tempfile.TemporaryFile(buffering=0)
+    fh = io.BufferedWriter(raw, buffer_size=WRITE_BUFFER_BYTES)
+    if fmt == 'csv':
+        write_csv(rows, fh, row_ids, chunk_rows)
+    elif fmt == 'csv.gz':
+        with gzip.GzipFile(fileobj=fh, mode='wb', compresslevel=6, mtime=0) as gz:
+            write_csv(rows, gz, row_ids, chunk_rows)
+    elif fmt == 'parquet':
+        write_parquet(rows, fh, row_ids, chunk_rows)
+    else:
+        raw.close()
+        raise ValueError(f"Unknown export format: {fmt!r}")
+    fh.flush()
+    fh.detach()
+    raw.seek(0)
+    return raw
@@ -0,0 +1,279 @@
+"""Plotly figure builders shared by the dashboard, batch jobs and other front ends."""
+import os
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+PLOTLY_LAYOUT = dict(
+    paper_bgcolor='rgba(0,0,0,0)',
+    plot_bgcolor='rgba(0,0,0,0)',
+    font=dict(family="DM Sans, sans-serif", color="#5a9070", size=11),
+    margin=dict(l=20, r=20, t=40, b=20),
+    xaxis=dict(gridcolor='rgba(30,52,38,0.6)', zerolinecolor='rgba(30,52,38,0.6)'),
+    yaxis=dict(gridcolor='rgba(30,52,38,0.6)', zerolinecolor='rgba(30,52,38,0.6)'),
+    hoverlabel=dict(bgcolor='#0a140d', bordercolor='rgba(74,222,128,0.3)', font=dict(color='#f0fdf4', family='DM Sans')),
+)
+
+GREEN_SEQ = ['#4ade80', '#22c55e', '#16a34a', '#15803d', '#166534', '#14532d', '#0f3d1f']
+GOLD = '#fbbf24'
+BLUE_AR = '#74acdf'
+GREEN_ACCENT = '#4ade80'
+
+# Above this many rows the scatters switch to WebGL on a sample and the box plot
+# ships precomputed quartiles, so the payload no longer grows with the match count.
+MAX_POINTS = int(os.environ.get('DASHBOARD_MAX_POINTS', '20000'))
+
+# Plotly is imported inside the builders: the first chart pays for it, not the
+# startup path that paints the hero before any figure is built.
+
+
+class FigureCache:
+    # Serialized figures keyed by (chart id, filter key, data version), shared by
+    # every session of the server process and evicted least-recently-used first
+    # once the stored JSON exceeds `max_bytes`.
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            payload = self.entries.get(key)
+            if payload is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return payload
+
+    def put(self, key, payload):
+        with self.lock:
+            if key in self.entries:
+                self.size -= len(self.entries.pop(key))
+            if len(payload) > self.max_bytes:
+                return
+            self.entries[key] = payload
+            self.size += len(payload)
+            while self.size > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= len(evicted)
+                self.evictions += 1
+
+    def stats(self):
+        with self.lock:
+            return {
+                'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                'entries': len(self.entries), 'bytes': self.size, 'max_bytes': self.max_bytes,
+            }
+
+
+def downsample(frame, max_points, by='Posicion'):
+    # Deterministic sample that keeps each position's share of the points.
+    if len(frame) <= max_points:
+        return frame
+    return frame.groupby(by, observed=True, dropna=False, group_keys=False).sample(
+        frac=max_points / len(frame), random_state=0)
+
+
+def box_stats(frame, value, by):
+    # Quartiles and 1.5·IQR whisker ends per group, matching plotly's own box stats.
+    grouped = frame.groupby(by, observed=True)[value]
+    q1, q3 = grouped.transform('quantile', 0.25), grouped.transform('quantile', 0.75)
+    iqr = q3 - q1
+    inside = frame[value].where((frame[value] >= q1 - 1.5 * iqr) & (frame[value] <= q3 + 1.5 * iqr))
+    inside_grouped = inside.groupby(frame[by], observed=True)
+    return pd.DataFrame({
+        'q1': grouped.quantile(0.25),
+        'median': grouped.median(),
+        'q3': grouped.quantile(0.75),
+        'lowerfence': inside_grouped.min(),
+        'upperfence': inside_grouped.max(),
+    })
+
+
+def fig_edad_hist(edad_hist):
+    import plotly.graph_objects as go
+    fig = go.Figure(go.Histogram(
+        x=edad_hist.index, y=edad_hist.values, histfunc='sum', nbinsx=20, marker_color=GREEN_ACCENT,
+        hovertemplate='Edad=%{x}<br>count=%{y}<extra></extra>'))
+    fig.update_traces(marker_line_color='rgba(74,222,128,0.3)', marker_line_width=1)
+    fig.update_layout(**PLOTLY_LAYOUT, showlegend=False, height=250, xaxis_title='Edad', yaxis_title='count')
+    return fig
+
+
+def fig_pie(pie_data):
+    if len(pie_data) == 0:
+        return None
+    import plotly.express as px
+    fig = px.pie(values=pie_data.values, names=pie_data.index, color_discrete_sequence=GREEN_SEQ, hole=0.65)
+    fig.update_traces(textfont=dict(color='#f0fdf4', size=11), marker=dict(line=dict(color='#0a140d', width=2)))
+    fig.update_layout(**PLOTLY_LAYOUT, showlegend=True, height=250, legend=dict(font=dict(color='#5a9070', size=10)))
+    return fig
+
+
+def fig_altura_pos(altura_pos):
+    if len(altura_pos) == 0:
+        return None
+    import plotly.express as px
+    fig = px.bar(x=altura_pos.values, y=altura_pos.index, orientation='h', color_discrete_sequence=[GOLD])
+    fig.update_traces(marker_line_color='rgba(251,191,36,0.3)', marker_line_width=1)
+    fig.update_layout(**PLOTLY_LAYOUT, showlegend=False, height=250)
+    return fig
+
+
+def fig_edad_altura(rows):
+    scatter_data = rows.dropna(subset=['Edad', 'Altura'])
+    if len(scatter_data) == 0:
+        return None
+    large = len(scatter_data) > MAX_POINTS
+    import plotly.express as px
+    fig = px.scatter(downsample(scatter_data, MAX_POINTS), x='Edad', y='Altura', color='Posicion', opacity=0.6,
+                     render_mode='webgl' if large else 'auto',
+                     color_discrete_sequence=GREEN_SEQ + [GOLD, BLUE_AR, '#e3001b', '#f5c400'])
+    fig.update_layout(**PLOTLY_LAYOUT, showlegend=True, height=320, legend=dict(font=dict(color='#5a9070', size=10)))
+    return fig
+
+
+def fig_top_players(rows):
+    top_players = rows.dropna(subset=['Valor de mercado']).nlargest(10, 'Valor de mercado')
+    if len(top_players) == 0:
+        return None
+    import plotly.express as px
+    fig = px.bar(top_players, x='Valor de mercado', y='Jugadores', orientation='h',
+                 color='Valor de mercado',
+                 color_continuous_scale=[[0, '#15803d'], [0.5, '#22c55e'], [1, '#4ade80']],
+                 hover_data=['Posicion', 'Club'])
+    fig.update_layout(**PLOTLY_LAYOUT, showlegend=False, height=340, coloraxis_showscale=False)
+    return fig
+
+
+def fig_valor_box(rows):
+    boxplot_data = rows.dropna(subset=['Valor de mercado', 'Posicion'])
+    if len(boxplot_data) == 0:
+        return None
+    if len(boxplot_data) > MAX_POINTS:
+        return fig_valor_box_stats(box_stats(boxplot_data, 'Valor de mercado', 'Posicion'))
+    import plotly.express as px
+    fig = px.box(boxplot_data, x='Posicion', y='Valor de mercado', color_discrete_sequence=[GREEN_ACCENT])
+    fig.update_traces(marker_color=GREEN_ACCENT, line_color=GREEN_ACCENT)
+    fig.update_layout(**PLOTLY_LAYOUT, showlegend=False, height=340, xaxis_tickangle=-45)
+    return fig
+
+
+def fig_valor_box_stats(stats):
+    # Box plot from precomputed quartiles and whisker ends (box_stats, or the cube's
+    # quantile sketches in sketch mode).
+    if len(stats) == 0:
+        return None
+    import plotly.graph_objects as go
+    fig = go.Figure(go.Box(
+        x=stats.index.astype(str), q1=stats['q1'], median=stats['median'], q3=stats['q3'],
+        lowerfence=stats['lowerfence'], upperfence=stats['upperfence'], name='Valor de mercado'))
+    fig.update_layout(xaxis_title='Posicion', yaxis_title='Valor de mercado')
+    fig.update_traces(marker_color=GREEN_ACCENT, line_color=GREEN_ACCENT)
+    fig.update_layout(**PLOTLY_LAYOUT, showlegend=False, height=340, xaxis_tickangle=-45)
+    return fig
+
+
+def fig_ranking(ranking, color, line_color, height):
+    if len(ranking) == 0:
+        return None
+    import plotly.express as px
+    fig = px.bar(x=ranking.values, y=ranking.index, orientation='h', color_discrete_sequence=[color])
+    fig.update_traces(marker_line_color=line_color, marker_line_width=1)
+    fig.update_layout(**PLOTLY_LAYOUT, showlegend=False, height=height)
+    return fig
+
+
+def fig_edad_valor(rows):
+    scatter_val = rows.dropna(subset=['Edad', 'Valor de mercado', 'Altura'])
+    if len(scatter_val) == 0:
+        return None
+    large = len(scatter_val) > MAX_POINTS
+    import plotly.express as px
+    fig = px.scatter(downsample(scatter_val, MAX_POINTS), x='Edad', y='Valor de mercado', color='Posicion',
+                     size='Altura', opacity=0.6, hover_data=['Jugadores', 'Club'],
+                     render_mode='webgl' if large else 'auto',
+                     color_discrete_sequence=GREEN_SEQ + [GOLD, BLUE_AR])
+    fig.update_layout(**PLOTLY_LAYOUT, showlegend=True, height=340, legend=dict(font=dict(color='#5a9070', size=10)))
+    return fig
+
+
+def fig_heatmap(table, color_scale, height):
+    if len(table) == 0:
+        return None
+    import plotly.express as px
+    fig = px.imshow(table, aspect='auto', color_continuous_scale=color_scale)
+    fig.update_layout(**PLOTLY_LAYOUT, showlegend=False, height=height)
+    return fig
+
+
+def fig_procedencia(inf_count):
+    if len(inf_count) == 0:
+        return None
+    labels = ['Externos' if not k else 'Inferiores' for k in inf_count.index]
+    import plotly.express as px
+    fig = px.pie(values=inf_count.values, names=labels, color_discrete_sequence=[GREEN_ACCENT, GOLD], hole=0.65)
+    fig.update_traces(textfont=dict(color='#f0fdf4', size=11), marker=dict(line=dict(color='#0a140d', width=2)))
+    fig.update_layout(**PLOTLY_LAYOUT, showlegend=True, height=340, legend=dict(font=dict(color='#5a9070', size=10)))
+    return fig
+
+
+def fig_trend(trend, color, fillcolor, marker_size, hovertemplate, height):
+    if len(trend) == 0:
+        return None
+    import plotly.graph_objects as go
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(
+        x=trend.index, y=trend.values, mode='lines+markers',
+        line=dict(color=color, width=2.5, shape='spline'),
+        marker=dict(color=color, size=marker_size, line=dict(color='#060e0a', width=2)),
+        fill='tozeroy', fillcolor=fillcolor,
+        hovertemplate=hovertemplate))
+    fig.update_layout(**PLOTLY_LAYOUT, showlegend=False, height=height)
+    return fig
+
+
+def fig_transfer_flow(flows):
+    # Sankey from Equipo Anterior (left) to Club (right); academies are drawn in gold.
+    if len(flows) == 0:
+        return None
+    origins = list(dict.fromkeys(flows['Equipo Anterior']))
+    clubs = list(dict.fromkeys(flows['Club']))
+    youth = dict(zip(flows['Equipo Anterior'], flows['Inferiores']))
+    import plotly.graph_objects as go
+    fig = go.Figure(go.Sankey(
+        arrangement='snap',
+        node=dict(label=origins + clubs, pad=12, thickness=14, line=dict(color='#0a140d', width=1),
+                  color=[GOLD if youth[origin] else '#a78bfa' for origin in origins] + [GREEN_ACCENT] * len(clubs)),
+        link=dict(source=[origins.index(origin) for origin in flows['Equipo Anterior']],
+                  target=[len(origins) + clubs.index(club) for club in flows['Club']],
+                  value=flows['Fichajes'], color='rgba(74,222,128,0.18)',
+                  hovertemplate='%{source.label} → %{target.label}<br>Fichajes: %{value}<extra></extra>')))
+    fig.update_layout(**PLOTLY_LAYOUT, showlegend=False, height=420)
+    return fig
+
+
+def fig_waterfall(records):
+    # Profiler stages as bars offset by their start time; nested stages are indented.
+    if not records:
+        return None
+    frame = pd.DataFrame(records)
+    labels = [' ' * depth + stage for depth, stage in zip(frame['depth'], frame['stage'])]
+    sizes = [f"{b / 1024:,.1f} KB" if pd.notna(b) else '' for b in frame['bytes']]
+    import plotly.graph_objects as go
+    fig = go.Figure(go.Bar(
+        x=frame['duration_ms'], base=frame['start_ms'], y=list(range(len(frame))), orientation='h',
+        marker_color=[GREEN_SEQ[min(depth, len(GREEN_SEQ) - 1)] for depth in frame['depth']],
+        customdata=list(zip(labels, sizes)),
+        hovertemplate='%{customdata[0]}<br>%{x:.1f} ms desde %{base:.1f} ms<br>%{customdata[1]}<extra></extra>'))
+    fig.update_layout(**PLOTLY_LAYOUT, showlegend=False, height=max(240, 18 * len(frame) + 80),
+                      xaxis_title='ms', yaxis_tickvals=list(range(len(frame))), yaxis_ticktext=labels,
+                      yaxis_autorange='reversed')
+    return fig
@@ -0,0 +1,207 @@
+"""Row-id indexes: sorted postings for the multiselect filters and the player-name search."""
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+FILTER_COLUMNS = ['Club', 'Temporada', 'Posicion']
+
+
+def filter_postings(df):
+    # Sorted row-id postings per Club/Temporada/Posicion value of `df`, as a CSR over
+    # the value codes: the rows of value `code` are order[offsets[code]:offsets[code + 1]].
+    postings = {}
+    for col in FILTER_COLUMNS:
+        codes, uniques = pd.factorize(df[col])
+        order = np.argsort(codes, kind='stable').astype(np.int32)
+        # Missing values (code -1) sort first and fall before offsets[0].
+        offsets = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+        postings[col] = ({value: code for code, value in enumerate(uniques.tolist())}, order, offsets)
+    return postings
+
+
+def build_filter_index(df):
+    # Postings are kept per block of rows, so appended rows only add a block of their own.
+    return {'n_rows': len(df), 'blocks': [(0, filter_postings(df))]}
+
+
+def extend_filter_index(index, delta):
+    return {
+        'n_rows': index['n_rows'] + len(delta),
+        'blocks': index['blocks'] + [(index['n_rows'], filter_postings(delta))],
+    }
+
+
+def _block_rows(postings, selections):
+    # Only the posting lists of the selected values are touched: the lists of one
+    # column are disjoint, so their union is a merge, and the columns are intersected
+    # from the shortest union up.
+    unions = []
+    for col, selected in selections.items():
+        if not selected:
+            continue
+        code_of, order, offsets = postings[col]
+        codes = [code_of[value] for value in selected if value in code_of]
+        lists = [order[offsets[code]:offsets[code + 1]] for code in codes]
+        unions.append(np.sort(np.concatenate(lists)) if len(lists) > 1
+                      else lists[0] if lists else np.array([], dtype=np.int32))
+    unions.sort(key=len)
+    rows = unions[0]
+    for other in unions[1:]:
+        if not len(rows):
+            break
+        rows = np.intersect1d(rows, other, assume_unique=True)
+    return rows
+
+
+def filter_rows(index, selections):
+    # Union the postings of the selected values inside a column, intersect across columns.
+    # Returns None when nothing is selected so callers can keep using the full frame.
+    if not any(selections.values()):
+        return None
+    rows = [start + _block_rows(postings, selections) for start, postings in index['blocks']]
+    return np.concatenate(rows) if len(rows) > 1 else rows[0]
+
+
+NGRAM_MAX = 3
+# Distinct names per name_postings call, the unit handed to worker processes.
+NAME_CHUNK = 50_000
+
+
+def normalize_name(text):
+    # Casefold and drop accents so "Álvarez" and "alvarez" index the same way.
+    text = unicodedata.normalize('NFKD', str(text).casefold())
+    return ''.join(ch for ch in text if not unicodedata.combining(ch))
+
+
+def name_ngrams(text, n):
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+EMPTY_NAME_INDEX = {
+    'n_rows': 0,
+    'uniques': pd.Index([], dtype=object),
+    'codes': np.array([], dtype=np.intp),
+    'names': [],
+    'trigram_counts': np.array([], dtype=np.intp),
+    'postings': {},
+    'blocks': [],
+}
+
+
+def build_name_index(df, map=map):
+    # n-gram postings (n = 1..NGRAM_MAX) over the distinct normalized names, plus a
+    # CSR mapping from name id to the row ids where that name appears.
+    return extend_name_index(EMPTY_NAME_INDEX, df, map)
+
+
+def name_postings(names, first_id):
+    # Normalizes `names`, numbered from `first_id`, and returns them with their n-gram
+    # postings. Pure and picklable, so chunks can run in worker processes.
+    normalized = [normalize_name(name) for name in names]
+    added = {}
+    for name_id, name in enumerate(normalized, start=first_id):
+        for n in range(1, NGRAM_MAX + 1):
+            for gram in name_ngrams(name, n):
+                added.setdefault(gram, []).append(name_id)
+    return normalized, {gram: np.array(ids, dtype=np.int32) for gram, ids in added.items()}
+
+
+def extend_name_index(index, delta, map=map):
+    # Only names first seen in `delta` are normalized and added to the postings, and
+    # the CSR for the new rows becomes a block of its own; nothing already indexed is
+    # recomputed. `map` runs name_postings over chunks of NAME_CHUNK names, e.g. an
+    # executor's map to spread them over processes.
+    raw = delta['Jugadores']
+    codes = index['uniques'].get_indexer(raw)
+    unseen = (codes == -1) & raw.notna().to_numpy()
+    new_codes, new_uniques = pd.factorize(raw[unseen])
+    first_id = len(index['uniques'])
+    codes[unseen] = new_codes + first_id
+    starts = range(0, len(new_uniques), NAME_CHUNK)
+    chunks = map(name_postings, [new_uniques[start:start + NAME_CHUNK].tolist() for start in starts],
+                 [first_id + start for start in starts])
+    normalized, added = [], {}
+    for names, chunk_postings in chunks:
+        # Chunks come back in order, so every posting list stays sorted.
+        normalized += names
+        for gram, ids in chunk_postings.items():
+            added.setdefault(gram, []).append(ids)
+    postings = dict(index['postings'])
+    for gram, parts in added.items():
+        if gram in postings:
+            parts = [postings[gram]] + parts
+        postings[gram] = parts[0] if len(parts) == 1 else np.concatenate(parts)
+    n_names = first_id + len(new_uniques)
+    order = np.argsort(codes, kind='stable')
+    offsets = np.searchsorted(codes[order], np.arange(n_names + 1))
+    return {
+        'n_rows': index['n_rows'] + len(delta),
+        'uniques': index['uniques'].append(pd.Index(new_uniques, dtype=object)),
+        'codes': np.concatenate([index['codes'], codes]),
+        'names': index['names'] + normalized,
+        'trigram_counts': np.concatenate([
+            index['trigram_counts'], [max(len(name) - NGRAM_MAX + 1, 0) for name in normalized]]).astype(np.intp),
+        'postings': postings,
+        'blocks': index['blocks'] + [(index['n_rows'], order, offsets)],
+    }
+
+
+def _name_rows(index, name_ids):
+    name_ids = np.asarray(name_ids, dtype=np.intp)
+    if len(name_ids) > 1024:
+        name_mask = np.zeros(len(index['names']) + 1, dtype=bool)
+        name_mask[name_ids] = True
+        # codes == -1 (missing names) lands on the trailing False slot.
+        return np.flatnonzero(name_mask[index['codes']])
+    rows = []
+    for row_start, order, offsets in index['blocks']:
+        # Blocks built before a name existed have no slot for it.
+        ids = name_ids[name_ids < len(offsets) - 1]
+        rows += [row_start + order[start:end] for start, end in zip(offsets[ids], offsets[ids + 1])]
+    return np.sort(np.concatenate(rows)) if rows else np.array([], dtype=np.intp)
+
+
+def names_contain(index, row_ids, query):
+    # Mask over `row_ids` of the rows whose normalized name contains `query` (already
+    # normalized). Each distinct name among them is checked once, which is cheap when
+    # the rows come from an earlier, shorter search.
+    codes = index['codes'][row_ids]
+    # codes == -1 (missing names) lands on the trailing slot, which never matches.
+    present = np.zeros(len(index['names']) + 1, dtype=bool)
+    present[codes] = True
+    name_ids = np.flatnonzero(present[:-1])
+    matches = np.zeros(len(present), dtype=bool)
+    matches[name_ids] = [query in index['names'][name_id] for name_id in name_ids]
+    return matches[codes]
+
+
+def search_names(index, query, fuzzy=False, limit=20, min_score=0.4):
+    # Substring match on normalized names: short queries are a single posting lookup,
+    # longer ones intersect their trigram postings and verify the survivors.
+    # With fuzzy=True names are ranked by the share of query trigrams they contain,
+    # ties broken by trigram Jaccard similarity so shorter, closer names come first.
+    query = normalize_name(query).strip()
+    if not query:
+        return np.array([], dtype=np.intp)
+    postings = index['postings']
+    if fuzzy:
+        grams = name_ngrams(query, NGRAM_MAX)
+        hits = [postings[gram] for gram in grams if gram in postings]
+        if not hits:
+            return np.array([], dtype=np.intp)
+        shared = np.bincount(np.concatenate(hits), minlength=len(index['names']))
+        scores = shared / len(grams)
+        jaccard = shared / (len(grams) + index['trigram_counts'] - shared).clip(min=1)
+        ranked = np.lexsort((-jaccard, -scores))[:limit]
+        return _name_rows(index, ranked[scores[ranked] >= min_score])
+    if len(query) <= NGRAM_MAX:
+        return _name_rows(index, postings.get(query, np.array([], dtype=np.int32)))
+    candidates = None
+    for gram in name_ngrams(query, NGRAM_MAX):
+        ids = postings.get(gram)
+        if ids is None:
+            return np.array([], dtype=np.intp)
+        candidates = ids if candidates is None else np.intersect1d(candidates, ids, assume_unique=True)
+    matches = [name_id for name_id in candidates if query in index['names'][name_id]]
+    return _name_rows(index, np.array(matches, dtype=np.int32))
@@ -0,0 +1,28 @@
+"""Append new seasons (or any batch of new rows) to the stored player table.
+
+    python -m engine.ingest temporada_2023.xlsx [more.csv ...] [--data futbolargentino.xlsx]
+
+Each file must hold only the new rows, with the workbook's columns. Running
+dashboards pick the segments up on their next rerun without reloading the history.
+"""
+import argparse
+
+from .storage import DATA_FILE, ingest_segment
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('sources', nargs='+', help='season workbooks (.xlsx) or CSV files with the new rows')
+    parser.add_argument('--data', default=DATA_FILE, help=f"workbook the rows are appended to (default: {DATA_FILE})")
+    args = parser.parse_args(argv)
+
+    for source in args.sources:
+        segment = ingest_segment(source, args.data)
+        if segment is None:
+            print(f"{source}: ya ingresado, sin cambios")
+        else:
+            print(f"{source}: {segment['rows']:,} filas agregadas")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,26 @@
+"""Write a league's player table into a Liga=/Temporada= partitioned dataset directory.
+
+    python -m engine.partition futbolargentino.xlsx datos/ --liga "Primera División"
+
+Run once per league into the same directory, then point the dashboard at it with
+DASHBOARD_DATA=datos/.
+"""
+import argparse
+
+from .storage import load_table, write_partitioned
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('source', help='workbook to convert (seasons ingested on top of it are included)')
+    parser.add_argument('root', help='dataset directory to write into')
+    parser.add_argument('--liga', required=True, help='league name used as the Liga= partition value')
+    args = parser.parse_args(argv)
+
+    df, _, _ = load_table(args.source)
+    written = write_partitioned(df, args.root, args.liga)
+    print(f"{args.liga}: {written:,} filas en {df['Temporada'].nunique()} temporadas")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""Opt-in stage timings for one dashboard run, with payload sizes and a JSON-lines log."""
+import json
+import time
+import uuid
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timezone
+
+
+class Profiler:
+    # Collects named, possibly nested stages of one script or fragment run. When
+    # disabled, stage() is a no-op context so instrumented paths cost nothing.
+
+    def __init__(self, enabled, log_path=None, kind='script', origin=None):
+        self.enabled = enabled
+        self.log_path = log_path
+        self.start(kind, origin)
+
+    def start(self, kind, origin=None):
+        # `origin` is a perf_counter() value taken earlier than now, e.g. before the
+        # script's imports, so that time shows in the records as well.
+        self.kind = kind
+        self.run_id = uuid.uuid4().hex[:12]
+        self.started_at = datetime.now(timezone.utc)
+        self.origin = time.perf_counter() if origin is None else origin
+        self.records = []
+        self.marks = {}
+        self.open = []
+        self.finished = False
+
+    def stage(self, name, nbytes=None):
+        if not self.enabled:
+            return nullcontext()
+        return self._stage(name, nbytes)
+
+    @contextmanager
+    def _stage(self, name, nbytes):
+        start = time.perf_counter()
+        record = {'stage': name, 'depth': len(self.open), 'start_ms': (start - self.origin) * 1000,
+                  'duration_ms': None, 'bytes': nbytes}
+        self.records.append(record)
+        self.open.append(record)
+        try:
+            yield record
+        finally:
+            record['duration_ms'] = (time.perf_counter() - start) * 1000
+            self.open.pop()
+
+    def mark(self, name):
+        # A zero-length record for a point in the run (the first paint), kept in
+        # `marks` as milliseconds since the origin. Only the first mark of a name counts.
+        if not self.enabled or name in self.marks:
+            return
+        self.marks[name] = self.elapsed_ms()
+        self.records.append({'stage': name, 'depth': len(self.open), 'start_ms': self.marks[name],
+                             'duration_ms': 0.0, 'bytes': None})
+
+    def count_bytes(self, nbytes):
+        # Adds to the payload size of the innermost open stage.
+        if self.enabled and self.open:
+            self.open[-1]['bytes'] = (self.open[-1]['bytes'] or 0) + nbytes
+
+    def elapsed_ms(self):
+        return (time.perf_counter() - self.origin) * 1000
+
+    def finish(self):
+        # Appends one JSON line per stage to the log, once per run.
+        if self.finished:
+            return
+        self.finished = True
+        if not (self.enabled and self.log_path and self.records):
+            return
+        total_ms = self.elapsed_ms()
+        lines = [json.dumps({
+            'run': self.run_id,
+            'kind': self.kind,
+            'ts': self.started_at.isoformat(timespec='milliseconds'),
+            'total_ms': round(total_ms, 3),
+            **record,
+        }, ensure_ascii=False) + '\n' for record in self.records]
+        try:
+            with open(self.log_path, 'a', encoding='utf-8') as fh:
+                fh.writelines(lines)
+        except OSError:
+            # A read-only or missing log location must never break the page.
+            pass
@@ -0,0 +1,419 @@
+"""Dataset handles and the pure query(filters) -> results API used by every front end."""
+import hashlib
+import multiprocessing
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import nullcontext
+from functools import cached_property
+from typing import NamedTuple, Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow.dataset as pads
+
+from .careers import build_career_index
+from .cube import build_cube, cube_series, extend_cube, shrink_cube
+from .indexes import (
+    FILTER_COLUMNS, NAME_CHUNK, build_filter_index, build_name_index, extend_filter_index, extend_name_index,
+    filter_rows, names_contain, normalize_name, search_names,
+)
+from .sql import SQLTable, sql_rows_and_cube
+from .storage import (
+    DATA_FILE, TABLE_COLUMNS, apply_schema, combine_tables, file_signature, ingested_segments, load_table,
+    partition_signature, read_arrow, read_partition_cubes, segment_version,
+)
+
+PAGE_SIZE = 50
+# 'pandas' (posting-list indexes + precomputed cube) or 'duckdb' (the same filters and
+# aggregations as SQL; needs the optional duckdb package).
+BACKEND = os.environ.get('DASHBOARD_BACKEND', 'pandas')
+# Threads (and, for the name index, processes) used by Dataset.warm.
+WARM_WORKERS = int(os.environ.get('DASHBOARD_WARM_WORKERS', os.cpu_count() or 1))
+# A search cube is shrunk by the rows a refinement dropped, rather than rebuilt from
+# the kept rows, when dropped rows + SHRINK_CELL_COST × its cells are fewer than the kept.
+SHRINK_CELL_COST = 4
+# Partition reads kept per PartitionedDataset, keyed by their club/season selection.
+SLICE_CACHE_ENTRIES = 8
+
+
+class Filters(NamedTuple):
+    search: str = ''
+    clubs: tuple = ()
+    seasons: tuple = ()
+    positions: tuple = ()
+
+    def selections(self):
+        return {'Club': self.clubs, 'Temporada': self.seasons, 'Posicion': self.positions}
+
+    def key(self):
+        # Order- and accent-insensitive identity of the filter combination, used as a cache key.
+        return (
+            normalize_name(self.search).strip(),
+            tuple(sorted(self.clubs)),
+            tuple(sorted(self.seasons)),
+            tuple(sorted(self.positions)),
+        )
+
+    @property
+    def active(self):
+        return sum([bool(self.key()[0]), bool(self.clubs), bool(self.seasons), bool(self.positions)])
+
+    def narrows(self, other):
+        # True when these filters differ from `other` but can only match a subset of its
+        # rows: every selection is a subset of the other's (an empty one allows all),
+        # and the search text extends the other's.
+        if self.key() == other.key():
+            return False
+        for new, old in zip(self.selections().values(), other.selections().values()):
+            if old and not (new and set(new) <= set(old)):
+                return False
+        return normalize_name(other.search).strip() in normalize_name(self.search).strip()
+
+
+class QueryState(NamedTuple):
+    # What refine() needs from an earlier result, without its rows or its Dataset, so
+    # sessions can keep it between reruns.
+    filters: Filters
+    row_ids: Optional[np.ndarray]
+    fuzzy: bool
+    version: str  # version of the Dataset `row_ids` refer to
+    cube: Optional[dict] = None
+
+
+class QueryResult:
+    # `rows` is only taken from the dataset on first access: the cube answers every
+    # aggregate, and page_rows() and the export read `row_ids` directly.
+    def __init__(self, filters, row_ids, series, fuzzy, dataset, cube=None, rows=None):
+        self.filters = filters
+        self.row_ids = row_ids  # None means every row matched
+        self.series = series
+        self.fuzzy = fuzzy
+        self.dataset = dataset  # the in-memory Dataset `row_ids` refers to
+        self.cube = cube  # cube of the matching rows when it was built from them (searches)
+        if rows is not None:
+            self.rows = rows
+
+    @cached_property
+    def rows(self):
+        return self.dataset.df if self.row_ids is None else self.dataset.df.take(self.row_ids)
+
+    def state(self):
+        return QueryState(self.filters, self.row_ids, self.fuzzy, self.dataset.version, self.cube)
+
+
+def summarize(cube):
+    # Hero totals and per-club stats from a cube's cells.
+    totals = cube_series(cube)
+    cells = cube['cells']
+    clubs = cells.groupby('Club', observed=True)[['n', 'valor_sum', 'valor_n']].sum()
+    clubs = clubs[clubs['n'] > 0]
+    clubs_stats = pd.DataFrame({
+        'players': clubs['n'],
+        'avg_val': clubs['valor_sum'] / clubs['valor_n'],
+    }).reset_index().sort_values('avg_val', ascending=False)
+    clubs_stats['Club'] = clubs_stats['Club'].astype(str)
+    return {
+        'jugadores': totals['jugadores'],
+        'temporadas': cells['Temporada'].nunique(),
+        'clubs': totals['clubs'],
+        'valor_prom': totals['valor_prom'],
+        'edad_prom': totals['edad_prom'],
+        'altura_prom': totals['altura_prom'],
+        'clubs_stats': clubs_stats,
+    }
+
+
+class Dataset:
+    # The converted player table plus the derived structures built from it. Each
+    # structure is built on first use and then shared by every query. `source` is
+    # the workbook's file signature and `segments` the seasons ingested on top of it.
+    partitioned = False
+
+    def __init__(self, df, version, source=None, segments=()):
+        self.df = df
+        self.version = version
+        self.source = source
+        self.segments = list(segments)
+        self.sort_orders = {}
+
+    @cached_property
+    def filter_index(self):
+        return build_filter_index(self.df)
+
+    @cached_property
+    def name_index(self):
+        return build_name_index(self.df)
+
+    @cached_property
+    def cube(self):
+        return build_cube(self.df)
+
+    @cached_property
+    def careers(self):
+        return build_career_index(self.df)
+
+    def sort_order(self, column, ascending=True):
+        # Row positions of the whole table sorted by `column` (stable, missing values
+        # last), computed once per column and direction.
+        key = (column, ascending)
+        if key not in self.sort_orders:
+            ordered = self.df[column].reset_index(drop=True).sort_values(
+                ascending=ascending, na_position='last', kind='stable')
+            self.sort_orders[key] = ordered.index.to_numpy()
+        return self.sort_orders[key]
+
+    def extended(self, delta, segment):
+        # A new Dataset with `delta` appended. Structures this one has already built
+        # are extended from the new rows alone; the rest stay lazy. `self` is left
+        # untouched for queries still running against it.
+        df, dtypes = combine_tables([self.df, delta])
+        delta = apply_schema(delta.copy(deep=False), dtypes)
+        dataset = Dataset(df, segment_version(self.version, [segment]), self.source, self.segments + [segment])
+        built = self.__dict__
+        if 'filter_index' in built:
+            dataset.filter_index = extend_filter_index(self.filter_index, delta)
+        if 'name_index' in built:
+            dataset.name_index = extend_name_index(self.name_index, delta)
+        if 'cube' in built:
+            dataset.cube = extend_cube(self.cube, delta, dtypes)
+        if 'filter_options' in built:
+            dataset.filter_options = {
+                col: sorted(set(self.filter_options[col]) | set(delta[col].dropna().unique().tolist()))
+                for col in FILTER_COLUMNS
+            }
+        return dataset
+
+    def warm(self, workers=WARM_WORKERS):
+        # Builds every structure not built yet concurrently: the filter index, cube and
+        # filter options on a thread pool, the name index's n-grams across a process
+        # pool. They are attached together once all are done, and the caller publishes
+        # the Dataset afterwards, so no session waits on a half-built one. Returns self.
+        pending = [name for name in ('filter_index', 'name_index', 'cube', 'careers', 'filter_options', 'summary')
+                   if name not in self.__dict__]
+        if BACKEND == 'duckdb' and 'sql_table' not in self.__dict__:
+            pending.append('sql_table')
+        if not pending:
+            return self
+        # Worker processes only pay off once there are several chunks of names to split.
+        parallel_names = 'name_index' in pending and workers > 1 and len(self.df) > 2 * NAME_CHUNK
+        processes = (ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn'))
+                     if parallel_names else nullcontext())
+        with ThreadPoolExecutor(max(workers, 1)) as threads, processes:
+            builders = {name: getattr(Dataset, name).func for name in pending if name != 'summary'}
+            if parallel_names:
+                builders['name_index'] = lambda dataset: build_name_index(dataset.df, processes.map)
+            futures = {name: threads.submit(builder, self) for name, builder in builders.items()}
+            built = {name: future.result() for name, future in futures.items()}
+        if 'summary' in pending:
+            built['summary'] = summarize(built['cube'] if 'cube' in built else self.cube)
+        self.__dict__.update(built)
+        return self
+
+    @cached_property
+    def sql_table(self):
+        return SQLTable(self.df)
+
+    @cached_property
+    def filter_options(self):
+        return {col: sorted(self.df[col].dropna().unique().tolist()) for col in FILTER_COLUMNS}
+
+    @cached_property
+    def summary(self):
+        return summarize(self.cube)
+
+    def resolve(self, filters):
+        return self
+
+
+class PartitionedDataset:
+    # A Liga=/Temporada= partitioned Parquet directory (see storage.write_partitioned).
+    # Totals and filter options come from the per-partition cube files; rows are only
+    # read per query, for the partitions and Club row groups its filters select, into
+    # small in-memory Datasets kept in an LRU. Memory and load time follow the query.
+    partitioned = True
+
+    def __init__(self, root, source):
+        self.root = root
+        self.source = source
+        self.version = f"{os.path.basename(os.path.normpath(root))}-{source}"
+        self.segments = []
+        self.arrow = pads.dataset(root, format='parquet', partitioning='hive')
+        self.columns = [col for col in TABLE_COLUMNS + ['Liga'] if col in self.arrow.schema.names]
+        self.slices = OrderedDict()
+        self.lock = threading.Lock()
+
+    @cached_property
+    def cube(self):
+        return {'cells': read_partition_cubes(self.root), 'details': {}}
+
+    @cached_property
+    def filter_options(self):
+        cells = self.cube['cells']
+        return {col: sorted(cells[col].dropna().unique().tolist()) for col in FILTER_COLUMNS}
+
+    @cached_property
+    def summary(self):
+        return summarize(self.cube)
+
+    def warm(self, workers=WARM_WORKERS):
+        # Only the partition cubes are loaded up front; slices stay per query.
+        self.summary, self.filter_options
+        return self
+
+    def resolve(self, filters):
+        key = (tuple(sorted(filters.clubs)), tuple(sorted(filters.seasons)))
+        with self.lock:
+            if key in self.slices:
+                self.slices.move_to_end(key)
+                return self.slices[key]
+        dataset = self.read_slice(*key)
+        with self.lock:
+            self.slices[key] = dataset
+            while len(self.slices) > SLICE_CACHE_ENTRIES:
+                self.slices.popitem(last=False)
+        return dataset
+
+    def read_slice(self, clubs, seasons):
+        # Temporada prunes whole partitions; Club is checked against row-group
+        # statistics, so only matching files and row groups are decoded.
+        predicate = None
+        if seasons:
+            predicate = pads.field('Temporada').isin(list(seasons))
+        if clubs:
+            club_predicate = pads.field('Club').isin(list(clubs))
+            predicate = club_predicate if predicate is None else predicate & club_predicate
+        df = self.arrow.to_table(columns=self.columns, filter=predicate).to_pandas()
+        key = hashlib.sha256(repr((clubs, seasons)).encode()).hexdigest()[:12]
+        return Dataset(apply_schema(df), f"{self.version}:{key}")
+
+
+def load_dataset(path=DATA_FILE):
+    if os.path.isdir(path):
+        return PartitionedDataset(path, partition_signature(path))
+    source = file_signature(path)
+    df, version, segments = load_table(path)
+    return Dataset(df, version, source, segments)
+
+
+def refresh_dataset(dataset, path=DATA_FILE):
+    # Brings `dataset` up to date with `path`: unchanged, extended with the seasons
+    # ingested since it was loaded, or reloaded when the workbook itself changed.
+    # A partitioned directory is reopened whenever its file listing changes.
+    if os.path.isdir(path):
+        if dataset is None or dataset.source != partition_signature(path):
+            return load_dataset(path)
+        return dataset
+    if dataset is None or dataset.source != file_signature(path):
+        return load_dataset(path)
+    segments = ingested_segments(path)
+    if segments[:len(dataset.segments)] != dataset.segments:
+        return load_dataset(path)
+    added = segments[len(dataset.segments):]
+    for segment in added:
+        dataset = dataset.extended(read_arrow(segment['arrow']), segment)
+    return dataset
+
+
+def search_rows(dataset, search):
+    # Row ids whose player name contains `search`, falling back to similar names.
+    row_ids = search_names(dataset.name_index, search)
+    if len(row_ids) > 0:
+        return row_ids, False
+    row_ids = search_names(dataset.name_index, search, fuzzy=True)
+    return row_ids, len(row_ids) > 0
+
+
+def refine(dataset, filters, previous):
+    # Evaluates `filters`, which narrow `previous.filters`, against the previous
+    # result's rows only (`previous` is its QueryState). Returns None when the search no longer matches anything, so
+    # query() can fall back to similar names.
+    search = normalize_name(filters.search).strip()
+    previous_search = normalize_name(previous.filters.search).strip()
+    if filters.search and not search:
+        return None
+    previous_ids = previous.row_ids
+    keep = np.ones(len(previous_ids), dtype=bool)
+    for (col, selected), old in zip(filters.selections().items(), previous.filters.selections().values()):
+        if selected and set(selected) != set(old):
+            keep &= dataset.df[col].take(previous_ids).isin(selected).to_numpy()
+    if search != previous_search:
+        if previous_search:
+            # Typing on: only the few names the shorter search matched are re-checked.
+            keep &= names_contain(dataset.name_index, previous_ids, search)
+        else:
+            keep &= np.isin(previous_ids, search_names(dataset.name_index, search), assume_unique=True)
+        if not keep.any():
+            return None
+    row_ids = previous_ids[keep]
+    if not filters.search:
+        return QueryResult(filters, row_ids, cube_series(dataset.cube, filters.selections()), False, dataset)
+    dropped = len(previous_ids) - len(row_ids)
+    if (previous.cube is not None and 'sketches' not in previous.cube
+            and dropped + SHRINK_CELL_COST * len(previous.cube['cells']) < len(row_ids)):
+        # Subtracting the dropped rows' cube beats regrouping the kept ones.
+        cube, rows = shrink_cube(previous.cube, dataset.df.take(previous_ids[~keep])), None
+    else:
+        rows = dataset.df.take(row_ids)
+        cube = build_cube(rows)
+    return QueryResult(filters, row_ids, cube_series(cube), False, dataset, cube, rows)
+
+
+def query(dataset, filters, backend=None, previous=None):
+    # Resolves the filters to row ids through the filter and name indexes and returns
+    # lazily computed KPI values and chart series; the matching rows are only taken
+    # when a search has to aggregate them or a caller reads `rows`.
+    # Without a player search every series comes from the precomputed cube. When
+    # `previous` is the QueryState of a result these filters narrow, only its rows
+    # are re-checked.
+    backend = backend or BACKEND
+    if filters.search and not filters.key()[0]:
+        # A blank search (spaces only) matches every row, as its cache key says.
+        filters = filters._replace(search='')
+    dataset = dataset.resolve(filters)
+    if (backend == 'pandas' and previous is not None and previous.version == dataset.version
+            and previous.row_ids is not None and not previous.fuzzy and filters.narrows(previous.filters)):
+        result = refine(dataset, filters, previous)
+        if result is not None:
+            return result
+    search_row_ids, fuzzy = search_rows(dataset, filters.search) if filters.search else (None, False)
+    if backend == 'duckdb':
+        # Filtering and grouping run in DuckDB; the name search shares the n-gram index
+        # so both backends match exactly the same players.
+        row_ids, cube = sql_rows_and_cube(dataset.sql_table, filters.selections(), search_row_ids)
+        return QueryResult(filters, row_ids, cube_series(cube), fuzzy, dataset)
+    if backend != 'pandas':
+        raise ValueError(f"Unknown backend: {backend!r}")
+
+    row_ids = filter_rows(dataset.filter_index, filters.selections())
+    if filters.search:
+        if row_ids is None:
+            row_ids = search_row_ids
+        else:
+            row_ids = np.intersect1d(row_ids, search_row_ids, assume_unique=True)
+    if filters.search:
+        # Free-text search has no cube dimension, so aggregate the matching rows directly.
+        rows = dataset.df.take(row_ids)
+        cube = build_cube(rows)
+        return QueryResult(filters, row_ids, cube_series(cube), fuzzy, dataset, cube, rows)
+    return QueryResult(filters, row_ids, cube_series(dataset.cube, filters.selections()), fuzzy, dataset)
+
+
+def page_rows(result, sort_by=None, ascending=True, page=0, page_size=PAGE_SIZE):
+    # One page of a query result. Sorting walks the precomputed table-wide order and
+    # keeps the matching positions, so neither the full match set nor the table is
+    # re-sorted, and only `page_size` rows are taken.
+    dataset = result.dataset
+    start = page * page_size
+    if sort_by is None:
+        if result.row_ids is None:
+            return dataset.df.iloc[start:start + page_size]
+        positions = result.row_ids
+    else:
+        positions = dataset.sort_order(sort_by, ascending)
+        if result.row_ids is not None:
+            matches = np.zeros(len(dataset.df), dtype=bool)
+            matches[result.row_ids] = True
+            positions = positions[matches[positions]]
+    return dataset.df.take(positions[start:start + page_size])
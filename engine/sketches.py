@@ -0,0 +1,117 @@
+"""Mergeable quantile and distinct-count sketches stored per cube cell (opt-in).
+
+Quantiles use logarithmic buckets (DDSketch-style): reported quartiles and medians
+are within SKETCH_ALPHA relative error of the exact ones. Whisker ends are the
+extreme buckets inside the 1.5·IQR fences of those quartiles: each is within
+SKETCH_ALPHA of a real value lying inside the exact fences widened by the quartiles'
+error, but a value close to a fence may be kept or dropped, so the whisker can end
+on its neighbour instead (far off in a sparse tail).
+Distinct player counts use HyperLogLog with 2**HLL_PRECISION registers, a standard
+error of 1.04 / sqrt(2**HLL_PRECISION) (1.6%). Both merge by plain group-bys over
+the selected cells, so their cost follows the number of cells, not rows.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+SKETCHES = os.environ.get('DASHBOARD_SKETCHES', '0') != '0'
+SKETCH_ALPHA = 0.01
+HLL_PRECISION = 12
+
+GAMMA = (1 + SKETCH_ALPHA) / (1 - SKETCH_ALPHA)
+# Bucket of exact zeros; positive values land in buckets around log_GAMMA(value).
+ZERO_BUCKET = np.iinfo(np.int32).min
+
+
+def value_buckets(values):
+    # Bucket index per value (NaN for missing). Values must be non-negative.
+    values = np.asarray(values, dtype='float64')
+    buckets = np.full(len(values), np.nan)
+    positive = values > 0
+    buckets[positive] = np.ceil(np.log(values[positive]) / np.log(GAMMA))
+    buckets[values == 0] = ZERO_BUCKET
+    return pd.array(buckets, dtype='Int32')
+
+
+def bucket_values(buckets):
+    # The value every bucket stands for, within SKETCH_ALPHA of all values it holds.
+    buckets = np.asarray(buckets, dtype='float64')
+    return np.where(buckets == ZERO_BUCKET, 0.0, 2 * GAMMA ** buckets / (GAMMA + 1))
+
+
+def hll_registers(names):
+    # (register, rank) per non-missing name: the top HLL_PRECISION hash bits pick the
+    # register, the rank is the position of the first set bit in the rest.
+    hashes = pd.util.hash_pandas_object(names, index=False).to_numpy()
+    registers = (hashes >> np.uint64(64 - HLL_PRECISION)).astype(np.int32)
+    rest = hashes << np.uint64(HLL_PRECISION)
+    high, low = (rest >> np.uint64(32)).astype('float64'), (rest & np.uint64(0xFFFFFFFF)).astype('float64')
+    # frexp's exponent is the bit length, exact for 32-bit halves.
+    bit_length = np.where(high > 0, 32 + np.frexp(high)[1], np.frexp(low)[1])
+    ranks = np.minimum(64 - bit_length + 1, 64 - HLL_PRECISION + 1).astype(np.int8)
+    valid = names.notna().to_numpy()
+    return registers[valid], ranks[valid], valid
+
+
+def build_sketches(df, dims):
+    # Bucket counts of market values and HLL register maxima of player names per cell.
+    buckets = df[dims].assign(bucket=value_buckets(df['Valor de mercado']))
+    valor = (buckets.dropna(subset=['bucket'])
+             .groupby(dims + ['bucket'], observed=True, dropna=False).size().rename('n').reset_index())
+    registers, ranks, valid = hll_registers(df['Jugadores'])
+    names = df.loc[valid, dims].assign(register=registers, rank=ranks)
+    jugadores = names.groupby(dims + ['register'], observed=True, dropna=False)['rank'].max().reset_index()
+    return {'valor': valor, 'jugadores': jugadores}
+
+
+def merge_sketches(sketches, dims, dtypes):
+    # Sketches of several row sets over the union of their cells.
+    def merged(tables, keys, how):
+        tables = [table.astype({col: dtype for col, dtype in dtypes.items() if col in table}) for table in tables]
+        grouped = pd.concat(tables, ignore_index=True).groupby(keys, observed=True, dropna=False)
+        return getattr(grouped, how)().reset_index()
+
+    return {
+        'valor': merged([sketch['valor'] for sketch in sketches], dims + ['bucket'], 'sum'),
+        'jugadores': merged([sketch['jugadores'] for sketch in sketches], dims + ['register'], 'max'),
+    }
+
+
+def quantile_box(valor, by):
+    # Box statistics per `by` from the selected cells' bucket counts: quartiles with
+    # the same linear interpolation as pandas/plotly, and 1.5·IQR whisker ends.
+    counts = valor.groupby([by, 'bucket'], observed=True)['n'].sum()
+    stats = {}
+    for group, group_counts in counts.groupby(level=0, observed=True):
+        group_counts = group_counts[group_counts > 0].droplevel(0).sort_index()
+        if len(group_counts) == 0:
+            continue
+        values = bucket_values(group_counts.index)
+        cumulative = np.cumsum(group_counts.to_numpy())
+
+        def quantile(q):
+            position = (cumulative[-1] - 1) * q
+            lower, upper = np.searchsorted(cumulative, [np.floor(position) + 1, np.ceil(position) + 1])
+            return values[lower] + (values[upper] - values[lower]) * (position - np.floor(position))
+
+        q1, median, q3 = quantile(0.25), quantile(0.5), quantile(0.75)
+        inside = values[(values >= q1 - 1.5 * (q3 - q1)) & (values <= q3 + 1.5 * (q3 - q1))]
+        stats[group] = {'q1': q1, 'median': median, 'q3': q3, 'lowerfence': inside.min(), 'upperfence': inside.max()}
+    frame = pd.DataFrame.from_dict(stats, orient='index', columns=['q1', 'median', 'q3', 'lowerfence', 'upperfence'])
+    frame.index.name = by
+    return frame
+
+
+def distinct_count(jugadores):
+    # HyperLogLog estimate over the selected cells' registers.
+    m = 2 ** HLL_PRECISION
+    registers = np.zeros(m, dtype=np.int8)
+    merged = jugadores.groupby('register')['rank'].max()
+    registers[merged.index.to_numpy()] = merged.to_numpy()
+    estimate = 0.7213 / (1 + 1.079 / m) * m * m / np.sum(2.0 ** -registers.astype('float64'))
+    zeros = int((registers == 0).sum())
+    if estimate <= 2.5 * m and zeros:
+        # Linear counting is more accurate while many registers are still empty.
+        estimate = m * np.log(m / zeros)
+    return int(round(estimate))
@@ -0,0 +1,90 @@
+"""Optional DuckDB backend: the filters and cube aggregations of query() run as SQL."""
+import os
+import threading
+
+import numpy as np
+import pyarrow as pa
+
+from .cube import CUBE_DETAILS, CUBE_DIMS, CUBE_MEASURES, LazySeries
+
+# DuckDB parallelizes every scan and aggregation across this many threads.
+SQL_THREADS = int(os.environ.get('DASHBOARD_SQL_THREADS', os.cpu_count() or 1))
+
+DERIVED = {'Inferiores': "coalesce(contains(\"Equipo Anterior\", 'Inferiores'), false)"}
+
+
+def quote(column):
+    return '"' + column.replace('"', '""') + '"'
+
+
+def _column(name):
+    return DERIVED.get(name, quote(name))
+
+
+class SQLTable:
+    # An in-process DuckDB connection over one Dataset's table, registered from Arrow
+    # with an extra `_row` column holding each row's position in the pandas frame.
+
+    def __init__(self, df):
+        # Imported here so the pandas backend never loads duckdb, even when installed.
+        try:
+            import duckdb
+        except ImportError:
+            raise RuntimeError("DASHBOARD_BACKEND=duckdb needs the duckdb package (pip install duckdb)") from None
+        self.dtypes = df.dtypes
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        table = table.append_column('_row', pa.array(np.arange(len(df), dtype=np.int64)))
+        self.con = duckdb.connect()
+        self.con.execute(f"SET threads TO {SQL_THREADS}")
+        self.con.register('jugadores', table)
+        # One connection, one query at a time; each query still runs on SQL_THREADS.
+        self.lock = threading.Lock()
+
+    def fetch(self, sql, params=()):
+        with self.lock:
+            return self.con.sql(sql, params=list(params)).to_arrow_table()
+
+    def where(self, selections, search_ids=None):
+        clauses, params = [], []
+        for col, selected in selections.items():
+            if selected:
+                clauses.append(f"{quote(col)} IN ({', '.join('?' * len(selected))})")
+                params += [v.item() if isinstance(v, np.generic) else v for v in selected]
+        if search_ids is not None:
+            clauses.append("_row IN (SELECT unnest(?))")
+            params.append(np.asarray(search_ids, dtype=np.int64).tolist())
+        return (' WHERE ' + ' AND '.join(clauses)) if clauses else '', params
+
+    def row_ids(self, where, params):
+        return self.fetch(f"SELECT _row FROM jugadores{where} ORDER BY _row", params)['_row'].to_numpy()
+
+    def cube(self, where, params):
+        # Same cells and detail tables as cube.build_cube over the matching rows, with
+        # the grouping done by DuckDB; the small results get the frame's dtypes back.
+        dims = ', '.join(quote(dim) for dim in CUBE_DIMS)
+        measures = ', '.join(
+            f"coalesce(sum(CAST({quote(col)} AS DOUBLE)), 0) AS {name}_sum, count({quote(col)}) AS {name}_n"
+            for name, col in CUBE_MEASURES.items())
+        cells = self.fetch(f"SELECT {dims}, count(*) AS n, {measures} FROM jugadores{where} GROUP BY ALL", params)
+        cells = self._typed(cells, CUBE_DIMS)
+
+        def detail(dim):
+            table = self.fetch(
+                f"SELECT {dims}, {_column(dim)} AS {quote(dim)}, count(*) AS n FROM jugadores{where} GROUP BY ALL",
+                params)
+            return self._typed(table, CUBE_DIMS + [dim])
+
+        return {'cells': cells, 'details': LazySeries({dim: lambda dim=dim: detail(dim) for dim in CUBE_DETAILS})}
+
+    def _typed(self, table, keys):
+        frame = table.to_pandas()
+        frame = frame.astype({col: self.dtypes[col] for col in keys if col in self.dtypes})
+        frame = frame.astype({col: 'int64' for col in frame.columns if col == 'n' or col.endswith('_n')})
+        return frame.sort_values(keys, na_position='last', kind='stable').reset_index(drop=True)
+
+
+def sql_rows_and_cube(table, selections, search_ids=None):
+    # Row ids (None when nothing filters) and the cube of the matching rows.
+    where, params = table.where(selections, search_ids)
+    row_ids = table.row_ids(where, params) if where else None
+    return row_ids, table.cube(where, params)
@@ -0,0 +1,422 @@
+"""Workbook parsing, typed schema and the on-disk Arrow cache of the player table."""
+import hashlib
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+
+from .cube import CUBE_DIMS, build_cube
+
+DATA_FILE = 'futbolargentino.xlsx'
+CACHE_DIR = os.environ.get('DASHBOARD_CACHE_DIR', '.cache')
+# Bump whenever convert_data/apply_schema change so stale Arrow caches are rebuilt.
+SCHEMA_VERSION = 2
+
+RAW_COLUMNS = ['Jugadores', 'Posicion', 'Edad', 'Altura', 'Pie', 'Fichado', 'Equipo Anterior', 'Valor de mercado',
+               'Temporada', 'Club']
+CATEGORY_COLUMNS = ['Club', 'Posicion', 'Pie', 'Equipo Anterior']
+NARROW_DTYPES = {'Temporada': 'Int16', 'Edad': 'Int8', 'Año Fichaje': 'Int16', 'Altura': 'float32'}
+TABLE_COLUMNS = RAW_COLUMNS + ['Año Fichaje']
+
+# Partitioned layout: <root>/Liga=<league>/Temporada=<season>/part-0.parquet, plus a
+# _cube.parquet per partition (ignored by dataset discovery) with its cube cells.
+PARTITION_COLUMNS = ['Liga', 'Temporada']
+PARTITION_CUBE_FILE = '_cube.parquet'
+PARTITION_ROW_GROUP = 64 * 1024
+# Root file recording the listing signature as of the last write_partitioned, so
+# checking a directory for changes is one small read instead of a walk of the tree.
+PARTITION_MANIFEST = '_manifest.json'
+# Directories written by other tools have no manifest; their listing is walked again
+# at most this often.
+PARTITION_CHECK_SECONDS = float(os.environ.get('DASHBOARD_PARTITION_CHECK_S', '30'))
+_listing_checks = {}
+
+
+def file_signature(path):
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as fh:
+        for block in iter(lambda: fh.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def convert_data(df):
+    df['Valor de mercado'] = pd.to_numeric(df['Valor de mercado'], errors='coerce')
+    df['Edad'] = pd.to_numeric(df['Edad'], errors='coerce')
+    df['Altura'] = pd.to_numeric(df['Altura'], errors='coerce')
+    df['Temporada'] = pd.to_numeric(df['Temporada'], errors='coerce')
+    df['Fichado'] = pd.to_datetime(df['Fichado'], errors='coerce')
+    df['Año Fichaje'] = df['Fichado'].dt.year
+    df['Club'] = df['Club'].astype(str)
+    df['Posicion'] = df['Posicion'].astype(str)
+    df['Pie'] = df['Pie'].astype(str)
+    df['Equipo Anterior'] = df['Equipo Anterior'].astype(str)
+    df = df.replace('nan', np.nan)
+    return apply_schema(df)
+
+
+def category_dtypes(df):
+    # Sorted categories give every frame derived from `df` the same, stable codes.
+    return {col: pd.CategoricalDtype(sorted(df[col].dropna().unique())) for col in CATEGORY_COLUMNS}
+
+
+def apply_schema(df, dtypes=None):
+    dtypes = dtypes or category_dtypes(df)
+    for col in CATEGORY_COLUMNS:
+        df[col] = df[col].astype(dtypes[col])
+    for col, dtype in NARROW_DTYPES.items():
+        df[col] = df[col].astype(dtype)
+    return df
+
+
+def read_manifest():
+    try:
+        with open(os.path.join(CACHE_DIR, 'manifest.json'), encoding='utf-8') as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return {}
+
+
+def write_manifest(manifest):
+    manifest_path = os.path.join(CACHE_DIR, 'manifest.json')
+    tmp_manifest = f"{manifest_path}.{os.getpid()}.tmp"
+    with open(tmp_manifest, 'w', encoding='utf-8') as fh:
+        json.dump(manifest, fh, indent=2)
+    os.replace(tmp_manifest, manifest_path)
+
+
+def arrow_table(df):
+    # Float and datetime columns keep NaN/NaT as plain values instead of a validity
+    # bitmap, so pandas can use their buffers in place when the file is mapped.
+    table = pa.Table.from_pandas(df, preserve_index=False).combine_chunks()
+    for i, col in enumerate(table.column_names):
+        if df[col].dtype.kind in 'fM' and table[col].null_count:
+            values = np.ascontiguousarray(df[col].to_numpy())
+            array = pa.Array.from_buffers(table.field(i).type, len(df), [None, pa.py_buffer(values)])
+            table = table.set_column(i, table.field(i), array)
+    return table
+
+
+def write_arrow(df, arrow_path):
+    # One uncompressed record batch: every column is a single contiguous buffer that
+    # read_arrow maps instead of copying.
+    tmp_path = f"{arrow_path}.{os.getpid()}.tmp"
+    feather.write_feather(arrow_table(df), tmp_path, compression='uncompressed', chunksize=max(len(df), 1))
+    os.replace(tmp_path, arrow_path)
+
+
+def remove_quietly(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+# Ingested rows are kept as delivered next to the workbook, in <workbook>.segments/,
+# with a ledger of the workbook content they extend. Unlike CACHE_DIR it is never
+# cleared: the Arrow segments in the cache are rebuilt from it after a schema bump.
+LEDGER_FILE = 'segments.json'
+
+
+def segment_store(path):
+    return f"{os.path.splitext(os.path.abspath(path))[0]}.segments"
+
+
+def read_ledger(store):
+    try:
+        with open(os.path.join(store, LEDGER_FILE), encoding='utf-8') as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return None
+
+
+def write_ledger(store, ledger):
+    os.makedirs(store, exist_ok=True)
+    ledger_path = os.path.join(store, LEDGER_FILE)
+    tmp_ledger = f"{ledger_path}.{os.getpid()}.tmp"
+    with open(tmp_ledger, 'w', encoding='utf-8') as fh:
+        json.dump(ledger, fh, indent=2)
+    os.replace(tmp_ledger, ledger_path)
+
+
+def migrate_segments(store, entry):
+    # Caches written before the segment store held the only copy of the ingested rows;
+    # they are saved to the store while their Arrow files are still around.
+    segments = []
+    for segment in entry.get('segments', []):
+        if not os.path.exists(segment['arrow']):
+            continue
+        os.makedirs(store, exist_ok=True)
+        file_name = f"{segment['sha256'][:16]}.parquet"
+        read_arrow(segment['arrow'])[RAW_COLUMNS].to_parquet(os.path.join(store, file_name), index=False)
+        segments.append({key: segment[key] for key in ('source', 'sha256', 'rows')} | {'file': file_name})
+    ledger = {'sha256': entry['sha256'], 'segments': segments}
+    write_ledger(store, ledger)
+    return ledger
+
+
+def stored_segments(path, sha256, entry):
+    # Ledger entries of the rows ingested on top of workbook content `sha256`.
+    store = segment_store(path)
+    ledger = read_ledger(store)
+    if ledger is None and entry and entry.get('sha256') and entry.get('segments'):
+        ledger = migrate_segments(store, entry)
+    if ledger is None:
+        return []
+    if ledger['sha256'] != sha256:
+        # A new workbook is the new source of truth for everything ingested before it.
+        # The old ledger and its rows are set aside, not deleted.
+        os.replace(os.path.join(store, LEDGER_FILE), os.path.join(store, f"segments-{ledger['sha256'][:16]}.json"))
+        return []
+    return ledger['segments']
+
+
+def segment_arrow_path(path, sha256):
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(CACHE_DIR, f"{stem}-segment-{sha256[:16]}-v{SCHEMA_VERSION}.arrow")
+
+
+def converted_segment(path, segment):
+    # `segment` plus its Arrow file in the cache, converted again from the stored rows
+    # when the cache was cleared or the schema changed.
+    arrow_path = segment_arrow_path(path, segment['sha256'])
+    if not os.path.exists(arrow_path):
+        raw = read_rows(os.path.join(segment_store(path), segment['file']))
+        write_arrow(convert_data(raw[RAW_COLUMNS]), arrow_path)
+    return dict(segment, arrow=arrow_path)
+
+
+def converted_entry(path):
+    # The Excel parse + conversions only run when the workbook content changes.
+    # mtime/size is the cheap check; the sha256 is only recomputed when it moved.
+    # Returns the manifest entry: the Arrow file plus any seasons ingested since.
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    manifest = read_manifest()
+    mtime_ns, size = file_signature(path)
+    key = os.path.abspath(path)
+    entry = manifest.get(key)
+    if (entry and entry['mtime_ns'] == mtime_ns and entry['size'] == size
+            and entry.get('schema') == SCHEMA_VERSION and os.path.exists(entry['arrow'])
+            and all('file' in segment for segment in entry.get('segments', [])) and 'combined' not in entry):
+        return entry
+
+    sha256 = file_sha256(path)
+    stem = os.path.splitext(os.path.basename(path))[0]
+    arrow_path = os.path.join(CACHE_DIR, f"{stem}-{sha256[:16]}-v{SCHEMA_VERSION}.arrow")
+    if not os.path.exists(arrow_path):
+        write_arrow(convert_data(pd.read_excel(path)), arrow_path)
+    segments = [converted_segment(path, segment) for segment in stored_segments(path, sha256, entry)]
+    if entry:
+        if entry['arrow'] != arrow_path:
+            remove_quietly(entry['arrow'])
+        arrows = {segment['arrow'] for segment in segments}
+        for segment in entry.get('segments', []):
+            if segment['arrow'] not in arrows:
+                remove_quietly(segment['arrow'])
+        if entry.get('combined'):
+            # Older caches also kept the workbook and its segments as one combined file.
+            remove_quietly(entry['combined'])
+
+    entry = manifest[key] = {'mtime_ns': mtime_ns, 'size': size, 'sha256': sha256,
+                             'schema': SCHEMA_VERSION, 'arrow': arrow_path, 'segments': segments}
+    write_manifest(manifest)
+    return entry
+
+
+def ingested_segments(path):
+    # Seasons appended to `path` with ingest_segment, oldest first; [] without a store.
+    entry = read_manifest().get(os.path.abspath(path))
+    return entry.get('segments', []) if entry else []
+
+
+def read_rows(source):
+    # New rows as delivered: a DataFrame, a CSV file or a workbook (or, for segments
+    # migrated from older caches, a Parquet file).
+    if isinstance(source, pd.DataFrame):
+        return source.copy()
+    if str(source).lower().endswith('.csv'):
+        return pd.read_csv(source)
+    if str(source).lower().endswith('.parquet'):
+        return pd.read_parquet(source)
+    return pd.read_excel(source)
+
+
+def ingest_segment(source, path=DATA_FILE):
+    # Converts only the new rows (a season workbook, a CSV or a DataFrame) and stores
+    # them as an Arrow segment on top of `path`. Returns the segment, or None when the
+    # same content was already ingested.
+    entry = converted_entry(path)
+    if isinstance(source, pd.DataFrame):
+        sha256 = hashlib.sha256(pd.util.hash_pandas_object(source, index=False).to_numpy().tobytes()).hexdigest()
+        name = '<DataFrame>'
+    else:
+        sha256 = file_sha256(source)
+        name = os.path.abspath(source)
+    if sha256 == entry['sha256'] or any(segment['sha256'] == sha256 for segment in entry.get('segments', [])):
+        return None
+
+    raw = read_rows(source)
+    missing = [col for col in RAW_COLUMNS if col not in raw.columns]
+    if missing:
+        raise ValueError(f"{name} is missing columns: {', '.join(missing)}")
+    df = convert_data(raw[RAW_COLUMNS])
+
+    # The delivered rows go to the segment store first; the cache only holds their
+    # converted copy.
+    store = segment_store(path)
+    os.makedirs(store, exist_ok=True)
+    if isinstance(source, pd.DataFrame):
+        file_name = f"{sha256[:16]}.csv"
+        raw[RAW_COLUMNS].to_csv(os.path.join(store, file_name), index=False)
+    else:
+        file_name = f"{sha256[:16]}{os.path.splitext(source)[1].lower()}"
+        shutil.copyfile(source, os.path.join(store, file_name))
+    stored = {'source': name, 'sha256': sha256, 'rows': len(df), 'file': file_name}
+    ledger = read_ledger(store) or {'sha256': entry['sha256'], 'segments': []}
+    ledger['segments'].append(stored)
+    write_ledger(store, ledger)
+
+    write_arrow(df, segment_arrow_path(path, sha256))
+    segment = converted_segment(path, stored)
+    manifest = read_manifest()
+    manifest[os.path.abspath(path)].setdefault('segments', []).append(segment)
+    write_manifest(manifest)
+    return segment
+
+
+def read_arrow(arrow_path):
+    # Zero-copy where pandas allows it: strings and columns without nulls stay views
+    # of the memory-mapped file, whose pages every process reading it shares through
+    # the OS page cache. Only null masks and category codes with nulls are copied.
+    return feather.read_table(arrow_path, memory_map=True).to_pandas(split_blocks=True)
+
+
+def combine_tables(frames):
+    # Concatenates converted tables under the union of their categories. Existing
+    # category codes are remapped rather than re-parsed from strings.
+    dtypes = {
+        col: pd.CategoricalDtype(sorted(set().union(*(frame[col].cat.categories for frame in frames))))
+        for col in CATEGORY_COLUMNS
+    }
+    frames = [apply_schema(frame.copy(deep=False), dtypes) for frame in frames]
+    return pd.concat(frames, ignore_index=True), dtypes
+
+
+def segment_version(version, segments):
+    return version + ''.join(f"+{segment['sha256'][:8]}" for segment in segments)
+
+
+def segmented_table(entry):
+    # The workbook's Arrow file and one per ingested segment, each memory-mapped and
+    # concatenated here. Nothing is rewritten on ingest, so a new season costs only
+    # its own rows; the concatenation copies only what pandas cannot keep chunked.
+    frames = [read_arrow(entry['arrow'])] + [read_arrow(segment['arrow']) for segment in entry.get('segments', [])]
+    return frames[0] if len(frames) == 1 else combine_tables(frames)[0]
+
+
+def load_table(path=DATA_FILE):
+    # Returns the converted player table (workbook plus ingested seasons), a
+    # content-derived data version string and the segments it includes.
+    try:
+        entry = converted_entry(path)
+    except FileNotFoundError:
+        raise
+    except OSError:
+        # Read-only deploys still work, they just parse the workbook every time.
+        return convert_data(pd.read_excel(path)), f"{file_sha256(path)[:16]}-v{SCHEMA_VERSION}", []
+    version = os.path.splitext(os.path.basename(entry['arrow']))[0]
+    segments = entry.get('segments', [])
+    return segmented_table(entry), segment_version(version, segments), segments
+
+
+def _plain_strings(df):
+    # Categories go to Parquet as plain strings so Club predicates can use row-group
+    # statistics; readers re-apply the schema.
+    return df.astype({col: 'str' for col in CATEGORY_COLUMNS if col in df})
+
+
+def write_parquet_atomic(df, parquet_path, **kwargs):
+    tmp_path = f"{parquet_path}.{os.getpid()}.tmp"
+    pq.write_table(pa.Table.from_pandas(_plain_strings(df), preserve_index=False), tmp_path, **kwargs)
+    os.replace(tmp_path, parquet_path)
+
+
+def write_partitioned(df, root, league):
+    # Writes the converted table under `root` for `league`, one directory per season.
+    # Rows are sorted by Club so a club filter only reads the row groups holding it.
+    # Rows without a season cannot be placed in a partition and are skipped.
+    written = 0
+    for season, part in df.groupby('Temporada'):
+        part_dir = os.path.join(root, f"Liga={league}", f"Temporada={int(season)}")
+        os.makedirs(part_dir, exist_ok=True)
+        part = part.sort_values('Club', kind='stable')
+        write_parquet_atomic(part.drop(columns=PARTITION_COLUMNS, errors='ignore'),
+                             os.path.join(part_dir, 'part-0.parquet'), row_group_size=PARTITION_ROW_GROUP)
+        write_parquet_atomic(build_cube(part)['cells'], os.path.join(part_dir, PARTITION_CUBE_FILE))
+        written += len(part)
+    write_partition_manifest(root)
+    return written
+
+
+def listing_signature(root):
+    # Content version of a partitioned directory from its file listing (path, size, mtime).
+    digest = hashlib.sha256()
+    for dirpath, dirnames, filenames in sorted(os.walk(root)):
+        dirnames.sort()
+        for name in sorted(filenames):
+            if name.endswith('.tmp') or (dirpath == root and name == PARTITION_MANIFEST):
+                continue
+            stat = os.stat(os.path.join(dirpath, name))
+            digest.update(f"{os.path.relpath(os.path.join(dirpath, name), root)}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+    return digest.hexdigest()[:16]
+
+
+def write_partition_manifest(root):
+    manifest_path = os.path.join(root, PARTITION_MANIFEST)
+    tmp_manifest = f"{manifest_path}.{os.getpid()}.tmp"
+    with open(tmp_manifest, 'w', encoding='utf-8') as fh:
+        json.dump({'signature': listing_signature(root)}, fh)
+    os.replace(tmp_manifest, manifest_path)
+
+
+def partition_signature(root):
+    # Version of a partitioned directory, checked on every rerun and API request: the
+    # manifest when there is one, else a listing walk at most every PARTITION_CHECK_SECONDS.
+    try:
+        with open(os.path.join(root, PARTITION_MANIFEST), encoding='utf-8') as fh:
+            return json.load(fh)['signature']
+    except (OSError, ValueError, KeyError):
+        pass
+    now = time.monotonic()
+    checked = _listing_checks.get(root)
+    if checked is None or now - checked[0] >= PARTITION_CHECK_SECONDS:
+        checked = _listing_checks[root] = (now, listing_signature(root))
+    return checked[1]
+
+
+def read_partition_cubes(root):
+    # Cube cells of the whole directory, summed from the per-partition files.
+    frames = []
+    for dirpath, _, filenames in os.walk(root):
+        if PARTITION_CUBE_FILE in filenames:
+            frames.append(pd.read_parquet(os.path.join(dirpath, PARTITION_CUBE_FILE)))
+    if not frames:
+        raise FileNotFoundError(f"No partitions found under '{root}'")
+    cells = pd.concat(frames, ignore_index=True)
+    cells = cells.groupby(CUBE_DIMS, dropna=False).sum().reset_index()
+    for col in CUBE_DIMS:
+        if col in CATEGORY_COLUMNS:
+            cells[col] = cells[col].astype(pd.CategoricalDtype(sorted(cells[col].dropna().unique())))
+    cells['Temporada'] = cells['Temporada'].astype(NARROW_DTYPES['Temporada'])
+    return cells
@@ -0,0 +1,18 @@
+import os
+
+import pytest
+
+from engine import DATA_FILE, load_dataset
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(scope='session')
+def data_file():
+    return os.path.join(ROOT, DATA_FILE)
+
+
+@pytest.fixture(scope='session')
+def dataset(data_file):
+    # The bundled workbook, loaded once for the whole run.
+    return load_dataset(data_file)
@@ -0,0 +1,41 @@
+import gzip
+import json
+
+import pytest
+
+from engine.api import QueryAPI
+
+
+@pytest.fixture(scope='module')
+def api(data_file, dataset):
+    api = QueryAPI(data_file)
+    api.dataset = dataset
+    return api
+
+
+def test_gzip_and_identity_bodies_have_their_own_etags(api):
+    target = '/rows?page_size=200'
+    status, plain_headers, plain = api.handle('GET', target, {})
+    assert status == 200 and 'Content-Encoding' not in plain_headers
+    status, gzip_headers, packed = api.handle('GET', target, {'accept-encoding': 'gzip, deflate'})
+    assert status == 200 and gzip_headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(packed) == plain
+    assert plain_headers['ETag'] != gzip_headers['ETag']
+    assert gzip_headers['Vary'] == plain_headers['Vary'] == 'Accept-Encoding'
+
+    # Each representation revalidates against its own tag.
+    status, headers, _ = api.handle('GET', target, {'if-none-match': plain_headers['ETag']})
+    assert status == 304 and headers['ETag'] == plain_headers['ETag']
+    status, headers, _ = api.handle('GET', target, {'accept-encoding': 'gzip',
+                                                    'if-none-match': f"W/{gzip_headers['ETag']}"})
+    assert status == 304 and headers['ETag'] == gzip_headers['ETag']
+    # A client that cannot decode gzip never gets a 304 for the gzipped body.
+    status, _, body = api.handle('GET', target, {'if-none-match': gzip_headers['ETag']})
+    assert status == 200 and body == plain
+
+
+def test_small_bodies_are_sent_as_they_are(api):
+    status, headers, body = api.handle('GET', '/series/jugadores', {'accept-encoding': 'gzip'})
+    assert status == 200 and 'Content-Encoding' not in headers
+    assert not headers['ETag'].endswith('-gzip"')
+    assert json.loads(body) == len(api.dataset.df)
@@ -0,0 +1,121 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from engine import Filters, query
+from engine.indexes import build_filter_index, extend_filter_index, filter_rows, normalize_name, search_names
+from engine.cube import shrink_cube
+from engine.querying import refine
+
+# Each pair narrows the first filters into the second: one more search character,
+# fewer clubs, an added season or position.
+NARROWINGS = [
+    (Filters('mar'), Filters('mart')),
+    (Filters('gonz'), Filters('gonzalez', clubs=('Boca', 'Banfield'))),
+    (Filters(clubs=('Boca', 'Banfield', 'Arsenal')), Filters(clubs=('Boca', 'Arsenal'))),
+    (Filters(clubs=('Boca',)), Filters(clubs=('Boca',), seasons=(2015, 2016), positions=('Defensa central',))),
+    (Filters('a', seasons=(2020, 2021)), Filters('al', seasons=(2021,))),
+    # These keep most of the previous rows.
+    (Filters('mart'), Filters('marti')),
+    (Filters('ez', clubs=('Boca', 'River Plate', 'Lanus')), Filters('ez', clubs=('Boca', 'River Plate'))),
+]
+
+
+# Several values of one field are OR-ed; 'Atlanta' is not in the data at all.
+SELECTIONS = [
+    {'Club': ['Boca'], 'Temporada': [], 'Posicion': []},
+    {'Club': ['Boca', 'River Plate', 'Atlanta'], 'Temporada': [], 'Posicion': []},
+    {'Club': ['Lanus', 'Tigre'], 'Temporada': [2010, 2021, 2022], 'Posicion': ['Portero', 'Pivote']},
+    {'Club': [], 'Temporada': [2008], 'Posicion': ['Delantero centro', 'Extremo derecho']},
+    {'Club': ['Atlanta'], 'Temporada': [2015], 'Posicion': []},
+]
+SEARCHES = ['a', 'ez', 'mar', 'martín', 'MARTIN', 'Álvaro', 'alvaro pereira', 'peña', 'ñ', 'zzzz']
+
+
+def assert_same_result(refined, fresh):
+    assert sorted(refined.row_ids) == sorted(fresh.row_ids)
+    assert list(refined.series.builders) == list(fresh.series.builders)
+    for name in fresh.series.builders:
+        expected, actual = fresh.series[name], refined.series[name]
+        if isinstance(expected, pd.DataFrame):
+            pd.testing.assert_frame_equal(actual, expected, check_exact=False)
+        elif isinstance(expected, pd.Series):
+            pd.testing.assert_series_equal(actual, expected, check_exact=False)
+        elif pd.isna(expected):
+            assert pd.isna(actual), name
+        else:
+            assert actual == pytest.approx(expected), name
+
+
+def test_blank_search_matches_like_no_search(dataset):
+    # Same cache key, so the result has to be the same: a space typed in the search
+    # box must not cache empty charts under the unfiltered key.
+    assert Filters(' ').key() == Filters().key()
+    blank, unfiltered = query(dataset, Filters(' ')), query(dataset, Filters())
+    assert len(blank.rows) == len(unfiltered.rows) == len(dataset.df)
+    assert blank.series['jugadores'] == unfiltered.series['jugadores']
+    assert Filters(' ').active == 0
+
+
+def test_query_function_survives_submodule_imports(dataset):
+    # engine.api imports the engine's submodules directly; the package's query()
+    # export must still be the function afterwards.
+    import engine
+    import engine.api  # noqa: F401
+    from engine import query as exported
+
+    assert exported is engine.query is query
+    assert len(engine.query(dataset, Filters(clubs=('Boca',))).rows) > 0
+
+
+@pytest.mark.parametrize('before, after', NARROWINGS)
+def test_refine_matches_a_fresh_query(dataset, before, after):
+    assert after.narrows(before)
+    previous = query(dataset, before).state()
+    refined = refine(dataset, after, previous)
+    assert refined is not None
+    assert_same_result(refined, query(dataset, after))
+    # query() takes the same path when handed the previous state.
+    assert_same_result(query(dataset, after, previous=previous), query(dataset, after))
+
+
+@pytest.mark.parametrize('selections', SELECTIONS, ids=str)
+def test_filter_rows_match_a_pandas_mask(dataset, selections):
+    df = dataset.df
+    mask = np.ones(len(df), dtype=bool)
+    for col, selected in selections.items():
+        if selected:
+            mask &= df[col].isin(selected).to_numpy()
+    expected = np.flatnonzero(mask)
+    np.testing.assert_array_equal(filter_rows(dataset.filter_index, selections), expected)
+    # Appended rows get a block of their own; the blocks together answer the same.
+    split = (df['Temporada'] <= 2015).sum()
+    index = extend_filter_index(build_filter_index(df.iloc[:split]), df.iloc[split:])
+    np.testing.assert_array_equal(filter_rows(index, selections), expected)
+
+
+@pytest.mark.parametrize('search', SEARCHES)
+def test_search_names_matches_a_substring_scan(dataset, search):
+    names = dataset.df['Jugadores']
+    normalized = names.map(normalize_name, na_action='ignore')
+    expected = np.flatnonzero(normalized.str.contains(normalize_name(search), regex=False, na=False).to_numpy())
+    np.testing.assert_array_equal(search_names(dataset.name_index, search), expected)
+
+
+def test_refine_by_shrinking_the_cube_matches_a_fresh_query(dataset, monkeypatch):
+    # With no per-cell cost, every search narrowing that drops fewer rows than it
+    # keeps subtracts the dropped rows from the previous cube.
+    from engine import querying
+
+    shrunk = []
+
+    def spy(cube, removed):
+        shrunk.append(len(removed))
+        return shrink_cube(cube, removed)
+
+    monkeypatch.setattr(querying, 'SHRINK_CELL_COST', 0)
+    monkeypatch.setattr(querying, 'shrink_cube', spy)
+    for before, after in NARROWINGS:
+        previous = query(dataset, before).state()
+        assert_same_result(refine(dataset, after, previous), query(dataset, after))
+    assert shrunk
@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+from engine.cube import build_cube, cube_series
+from engine.figures import box_stats
+from engine.sketches import HLL_PRECISION, SKETCH_ALPHA
+
+HLL_ERROR = 1.04 / np.sqrt(2 ** HLL_PRECISION)
+
+
+@pytest.fixture(scope='module')
+def cube(dataset):
+    return build_cube(dataset.df, sketches=True)
+
+
+def selections(df):
+    yield {}
+    for col in ('Club', 'Temporada'):
+        for value in df[col].dropna().unique():
+            yield {col: [value]}
+
+
+def selected_rows(df, selection):
+    for col, values in selection.items():
+        df = df[df[col].isin(values)]
+    return df
+
+
+def test_quartiles_are_within_the_relative_error(dataset, cube):
+    for selection in selections(dataset.df):
+        rows = selected_rows(dataset.df, selection).dropna(subset=['Valor de mercado'])
+        exact = box_stats(rows, 'Valor de mercado', 'Posicion')
+        approx = cube_series(cube, selection)['valor_box'].reindex(exact.index)
+        for stat in ('q1', 'median', 'q3'):
+            error = (approx[stat] - exact[stat]).abs() / exact[stat]
+            assert (error <= SKETCH_ALPHA + 1e-9).all(), (selection, stat, error.max())
+
+
+def test_whiskers_stand_for_values_inside_the_widened_fences(dataset, cube):
+    low, high = 1 - SKETCH_ALPHA, 1 + SKETCH_ALPHA
+    for selection in selections(dataset.df):
+        rows = selected_rows(dataset.df, selection).dropna(subset=['Valor de mercado'])
+        approx = cube_series(cube, selection)['valor_box']
+        for position, values in rows.groupby('Posicion', observed=True)['Valor de mercado']:
+            q1, q3 = values.quantile(0.25) * low, values.quantile(0.75) * high
+            lower, upper = (q1 - 1.5 * (q3 - q1)) / high, (q3 + 1.5 * (q3 - q1)) / low
+            values = values.to_numpy()
+            for stat in ('lowerfence', 'upperfence'):
+                whisker = approx.loc[position, stat]
+                near = values[np.abs(values - whisker) <= SKETCH_ALPHA * values + 1e-6]
+                assert ((near >= lower) & (near <= upper)).any(), (selection, position, stat, whisker)
+
+
+def test_distinct_counts_are_within_three_standard_errors(dataset, cube):
+    for selection in selections(dataset.df):
+        exact = selected_rows(dataset.df, selection)['Jugadores'].nunique()
+        estimate = cube_series(cube, selection)['jugadores_distintos']
+        assert abs(estimate - exact) <= 3 * HLL_ERROR * exact, (selection, estimate, exact)
@@ -0,0 +1,36 @@
+import pandas as pd
+import pytest
+
+from engine import Filters, query
+
+pytest.importorskip('duckdb')
+# DuckDB deprecates result methods between releases; fail rather than warn.
+pytestmark = pytest.mark.filterwarnings('error::DeprecationWarning')
+
+FILTERS = [
+    Filters(),
+    Filters(clubs=('Boca', 'Banfield')),
+    Filters(seasons=(2008, 2015, 2022), positions=('Portero', 'Defensa central')),
+    Filters('gonzalez'),
+    Filters('mart', clubs=('Arsenal', 'Boca'), seasons=(2019, 2020)),
+    Filters('zzzz'),
+]
+
+
+@pytest.mark.parametrize('filters', FILTERS, ids=lambda filters: repr(tuple(filters)))
+def test_duckdb_matches_pandas(dataset, filters):
+    expected, actual = query(dataset, filters, 'pandas'), query(dataset, filters, 'duckdb')
+    assert actual.fuzzy == expected.fuzzy
+    assert sorted(actual.rows.index) == sorted(expected.rows.index)
+    pd.testing.assert_frame_equal(actual.rows.sort_index(), expected.rows.sort_index())
+    assert list(actual.series.builders) == list(expected.series.builders)
+    for name in expected.series.builders:
+        want, got = expected.series[name], actual.series[name]
+        if isinstance(want, pd.DataFrame):
+            pd.testing.assert_frame_equal(got, want, check_exact=False)
+        elif isinstance(want, pd.Series):
+            pd.testing.assert_series_equal(got, want, check_exact=False)
+        elif pd.isna(want):
+            assert pd.isna(got), name
+        else:
+            assert got == pytest.approx(want), name
@@ -0,0 +1,99 @@
+import json
+import os
+import shutil
+
+import pandas as pd
+import pytest
+
+from engine import storage
+
+
+@pytest.fixture
+def workbook(data_file, tmp_path, monkeypatch):
+    # A private copy of the workbook and an empty cache directory.
+    monkeypatch.setattr(storage, 'CACHE_DIR', str(tmp_path / 'cache'))
+    path = tmp_path / storage.DATA_FILE
+    shutil.copyfile(data_file, path)
+    return str(path)
+
+
+@pytest.fixture
+def season(workbook):
+    rows = pd.read_excel(workbook, nrows=40)[storage.RAW_COLUMNS]
+    rows['Temporada'] = 2030
+    return rows
+
+
+def seasons_loaded(workbook):
+    df, _, segments = storage.load_table(workbook)
+    return (df['Temporada'] == 2030).sum(), len(segments)
+
+
+def test_ingested_rows_survive_a_schema_bump(workbook, season, monkeypatch):
+    storage.ingest_segment(season, workbook)
+    assert seasons_loaded(workbook) == (40, 1)
+    old_arrow = storage.converted_entry(workbook)['segments'][0]['arrow']
+
+    monkeypatch.setattr(storage, 'SCHEMA_VERSION', storage.SCHEMA_VERSION + 1)
+    assert seasons_loaded(workbook) == (40, 1)
+    assert not os.path.exists(old_arrow)
+
+
+def test_ingested_rows_survive_a_cleared_cache(workbook, season):
+    storage.ingest_segment(season, workbook)
+    shutil.rmtree(storage.CACHE_DIR)
+    assert seasons_loaded(workbook) == (40, 1)
+
+
+def test_older_caches_are_moved_to_the_segment_store(workbook, season):
+    # Before the segment store, the cached Arrow file was the only copy of a segment.
+    storage.ingest_segment(season, workbook)
+    shutil.rmtree(storage.segment_store(workbook))
+    manifest_path = os.path.join(storage.CACHE_DIR, 'manifest.json')
+    with open(manifest_path, encoding='utf-8') as fh:
+        manifest = json.load(fh)
+    for segment in manifest[os.path.abspath(workbook)]['segments']:
+        del segment['file']
+    with open(manifest_path, 'w', encoding='utf-8') as fh:
+        json.dump(manifest, fh)
+
+    assert seasons_loaded(workbook) == (40, 1)
+    shutil.rmtree(storage.CACHE_DIR)
+    assert seasons_loaded(workbook) == (40, 1)
+
+
+def test_partition_checks_do_not_walk_the_tree(dataset, tmp_path, monkeypatch):
+    root = str(tmp_path / 'datos')
+    df = dataset.df[dataset.df['Temporada'].isin([2020, 2021])]
+    storage.write_partitioned(df, root, 'Primera')
+    first = storage.partition_signature(root)
+    assert first == storage.listing_signature(root)
+
+    def no_walk(*args, **kwargs):
+        raise AssertionError("os.walk during a version check")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(storage.os, 'walk', no_walk)
+        assert storage.partition_signature(root) == first
+
+    # Every write_partitioned keeps the manifest up to date.
+    storage.write_partitioned(df, root, 'Nacional')
+    assert storage.partition_signature(root) not in (first, None)
+    assert storage.partition_signature(root) == storage.listing_signature(root)
+
+
+def test_ingesting_writes_only_the_new_rows(workbook, season):
+    from engine import load_dataset, refresh_dataset
+
+    dataset = load_dataset(workbook)
+    storage.ingest_segment(season, workbook)
+    storage.ingest_segment(season.assign(Temporada=2031), workbook)
+    refreshed, loaded = refresh_dataset(dataset, workbook), load_dataset(workbook)
+    assert refreshed.version == loaded.version
+    pd.testing.assert_frame_equal(refreshed.df, loaded.df)
+
+    # The workbook's and each segment's Arrow files, and no combined copy of them.
+    entry = storage.converted_entry(workbook)
+    expected = {entry['arrow']} | {segment['arrow'] for segment in entry['segments']}
+    assert {os.path.join(storage.CACHE_DIR, name) for name in os.listdir(storage.CACHE_DIR)
+            if name.endswith('.arrow')} == expected